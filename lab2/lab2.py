@@ -1,11 +1,22 @@
 import urllib.request
+import urllib.error
+import urllib.parse
 import pandas as pd
+import numpy as np
 from datetime import datetime
+import io
 import os
 import glob
 import time 
 import hashlib
 import json
+import re
+import sys
+import argparse
+import itertools
+import threading
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 ascii_art = """
 ⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣤⣾⡿⠿⢿⣦⡀⠀⠀⠀⠀⠀⠀
@@ -37,261 +48,1009 @@ ascii_art = """
 
 
 
-REGIONS = {
-    1: 'Вінницька', 2: 'Волинська', 3: 'Дніпропетровська', 4: 'Донецька', 5: 'Житомирська',
-    6: 'Закарпатська', 7: 'Запорізька', 8: 'Івано-Франківська', 9: 'Київська', 10: 'Кіровоградська',
-    11: 'Луганська', 12: 'Львівська', 13: 'Миколаївська', 14: 'Одеська', 15: 'Полтавська',
-    16: 'Рівенська', 17: 'Сумська', 18: 'Тернопільська', 19: 'Харківська', 20: 'Херсонська',
-    21: 'Хмельницька', 22: 'Черкаська', 23: 'Чернівецька', 24: 'Чернігівська', 25: 'Республіка Крим',26: 'Київ',27:'Севастополь',
-}
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "countries.json")
+DEFAULT_COUNTRY = "UKR"
 
+class Country:
+    # provinces of one NOAA country, indexed both ways: dicts for single ids
+    # and a dense NOAA id -> local id array for mapping whole columns at once
+    def __init__(self, code, name, provinces):
+        self.code = code
+        self.name = name
+        self.names = {p['id']: p['name'] for p in provinces}
+        self.local_to_noaa = {p['id']: p['noaa_id'] for p in provinces}
+        self.noaa_to_local = {p['noaa_id']: p['id'] for p in provinces}
+        self.noaa_names = {p['noaa_id']: p['name'] for p in provinces}
+        self.noaa_lookup = np.full(max(self.noaa_to_local, default=0) + 1, -1, dtype=np.int64)
+        self.noaa_lookup[list(self.noaa_to_local)] = list(self.noaa_to_local.values())
 
-NOAA_TO_UA = {
-    1: 22,  2: 24,  3: 23,  4: 25,   5: 3,   6: 4,  7: 8,  8: 19,   
-    9: 20, 10: 21, 11: 9, 12: 26, 13: 10, 14: 11, 15: 12, 16: 13,  
-    17: 14, 18: 15, 19: 16,  20: 27,  21: 17,  22: 18,  23: 6,  24: 1,  
-    25: 2 , 26: 7, 27: 5 
-}
+    def to_local(self, noaa_ids):
+        # -1 for ids that are not in the registry
+        noaa_ids = np.asarray(noaa_ids, dtype=np.int64)
+        known = (noaa_ids >= 0) & (noaa_ids < len(self.noaa_lookup))
+        return np.where(known, self.noaa_lookup[np.where(known, noaa_ids, 0)], -1)
 
-def print_regions():
-    print("\nregions of Ukraine")
-    for i in range(1, 28, 2):  
-        r1 = f"{i}. {REGIONS[i]:<18}"  
-        r2 = f"{i+1}. {REGIONS[i+1]}" if i+1 in REGIONS else ""  
+def load_countries(path=REGISTRY_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        registry = json.load(f)
+    return {code: Country(code, entry['name'], entry.get('provinces', [])) for code, entry in registry.items()}
+
+COUNTRIES = load_countries()
+
+def get_country(country=DEFAULT_COUNTRY):
+    if isinstance(country, Country):
+        return country
+    try:
+        return COUNTRIES[country.upper()]
+    except KeyError:
+        raise ValueError(f"country {country} is not in {REGISTRY_PATH}") from None
+
+def country_directory(directory, country=DEFAULT_COUNTRY):
+    # every country gets its own partition, Ukraine stays in the root so the
+    # existing vhi_data directories keep working
+    code = get_country(country).code
+    return directory if code == DEFAULT_COUNTRY else os.path.join(directory, code)
+
+REGIONS = COUNTRIES[DEFAULT_COUNTRY].names
+NOAA_TO_UA = COUNTRIES[DEFAULT_COUNTRY].noaa_to_local
+
+NOAA_URL = "https://www.star.nesdis.noaa.gov/smcd/emb/vci/VH/get_TS_admin.php"
+
+def print_regions(country=DEFAULT_COUNTRY):
+    country = get_country(country)
+    print(f"\nregions of {country.name}")
+    ids = sorted(country.names)
+    for i in range(0, len(ids), 2):
+        r1 = f"{ids[i]}. {country.names[ids[i]]:<18}"
+        r2 = f"{ids[i+1]}. {country.names[ids[i+1]]}" if i+1 < len(ids) else ""
         print(f"{r1} {r2}")
     print()
 
-def calculate_file_hash(filepath):
+CHUNK_SIZE = 64 * 1024
+
+def calculate_file_hash(filepath, chunk_size=CHUNK_SIZE):
     
     hasher = hashlib.md5()
     with open(filepath, 'rb') as f:
-        buf = f.read()
-        hasher.update(buf)
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
     return hasher.hexdigest()
 
+def write_digest(filepath, digest):
+    # md5sum-style sidecar next to the snapshot, replaced atomically
+    sidecar = filepath + '.md5'
+    with open(sidecar + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(f"{digest}  {os.path.basename(filepath)}\n")
+    os.replace(sidecar + '.tmp', sidecar)
 
+def read_digest(filepath):
+    sidecar = filepath + '.md5'
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(filepath):
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            return f.read().split()[0]
+    digest = calculate_file_hash(filepath)
+    try:
+        write_digest(filepath, digest)
+    except OSError:
+        pass
+    return digest
 
+def remove_snapshot(filepath):
+    for path in (filepath, filepath + '.md5', filepath + STORE_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
 
+def stream_to_file(response, filepath, chunk_size=CHUNK_SIZE):
+    # hash the body while it is written so the download is never read back
+    hasher = hashlib.md5()
+    size = 0
+    with open(filepath, 'wb') as out:
+        for chunk in iter(lambda: response.read(chunk_size), b''):
+            hasher.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+
+
+
+MANIFEST_NAME = "manifest.json"
+_manifest_lock = threading.Lock()
+
+def load_manifest(directory="vhi_data"):
+    # region name -> ETag / Last-Modified / size / digest of the snapshot we hold
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        print(f"manifest {path} is corrupted, ignoring it")
+        return {}
 
-def download_vhi_data(ua_id, directory="vhi_data"):
+def write_json_atomic(path, data):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+def update_manifest(directory, key, entry):
+    with _manifest_lock:
+        manifest = load_manifest(directory)
+        manifest[key] = entry
+        write_json_atomic(os.path.join(directory, MANIFEST_NAME), manifest)
+
+SNAPSHOT_PATTERN = re.compile(r'^vhi_(.+)_(\d{8}_\d{6})\.csv$')
+
+def snapshot_time(path):
+    # the YYYYMMDD_HHMMSS the downloader put in the name; unlike ctime it
+    # survives clones and copies. Names that do not match sort first
+    match = SNAPSHOT_PATTERN.match(os.path.basename(path))
+    return match.group(2) if match else ''
+
+
+def latest_snapshot(directory, name, manifest=None):
+    # the manifest doubles as the snapshot catalog, so the newest file of a
+    # region is one lookup; the glob scan is only a fallback for directories
+    # written by something that does not keep the manifest (e.g. lab3)
+    entry = (load_manifest(directory) if manifest is None else manifest).get(name, {})
+    if entry.get('file') and os.path.exists(os.path.join(directory, entry['file'])):
+        return os.path.join(directory, entry['file'])
+    existing_files = glob.glob(os.path.join(directory, f'vhi_{glob.escape(name)}_*.csv'))
+    return max(existing_files, key=snapshot_time) if existing_files else None
+
+
+def download_vhi_data(ua_id, directory="vhi_data", base_url=NOAA_URL, raise_errors=False, country=DEFAULT_COUNTRY):
+    country = get_country(country)
+    directory = country_directory(directory, country)
     if not os.path.exists(directory):
-        os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
 
-    noaa_id = list(NOAA_TO_UA.keys())[list(NOAA_TO_UA.values()).index(ua_id)]
-    url = f"https://www.star.nesdis.noaa.gov/smcd/emb/vci/VH/get_TS_admin.php?country=UKR&provinceID={noaa_id}&year1=1981&year2=2024&type=Mean"
+    noaa_id = country.local_to_noaa[ua_id]
+    name = country.names[ua_id]
+    url = f"{base_url}?country={country.code}&provinceID={noaa_id}&year1=1981&year2=2024&type=Mean"
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f'vhi_{REGIONS[ua_id]}_{timestamp}.csv'
+    filename = f'vhi_{name}_{timestamp}.csv'
     filepath = os.path.join(directory, filename)
+    temp_filepath = os.path.join(directory, f'temp_{filename}')
 
     try:
         
-        existing_files = glob.glob(os.path.join(directory, f'vhi_{REGIONS[ua_id]}_*.csv'))
-        if existing_files:
-        
-            latest_file = max(existing_files, key=os.path.getctime)
-            latest_hash = calculate_file_hash(latest_file)
+        manifest = load_manifest(directory)
+        latest_file = latest_snapshot(directory, name, manifest)
 
-           
-            temp_filepath = os.path.join(directory, f'temp_{filename}')
-            urllib.request.urlretrieve(url, temp_filepath)
-            new_hash = calculate_file_hash(temp_filepath)
+        # the manifest entry only counts if it still describes the file on disk
+        entry = manifest.get(name, {})
+        known = (latest_file is not None
+                 and entry.get('file') == os.path.basename(latest_file)
+                 and entry.get('content_length') == os.path.getsize(latest_file))
+
+        headers = {}
+        if known and entry.get('url') == url:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request, timeout=60) as response:
+                new_hash, new_size = stream_to_file(response, temp_filepath)
+                response_headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            print(f"data for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) not modified on server,skip ")
+            return None
+
+        new_entry = {
+            'url': url,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'content_length': new_size,
+            'digest': new_hash,
+            'file': filename,
+            'fetched': datetime.now().isoformat(timespec='seconds'),
+        }
+
+        if latest_file:
+            latest_hash = read_digest(latest_file)
 
             if latest_hash == new_hash:
-                print(f"data for  {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) alredy relevant,skip ")
+                print(f"data for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) alredy relevant,skip ")
                 os.remove(temp_filepath)
+                new_entry['file'] = os.path.basename(latest_file)
+                update_manifest(directory, name, new_entry)
                 return None
-            else:
-                print(f"found new data {REGIONS[ua_id]},updating...")
-                os.remove(latest_file) 
-                os.rename(temp_filepath, filepath) 
-                print(f"data for  {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) updated in {filepath}")
-                return filepath
+
+            print(f"found new data {name},updating...")
+            os.replace(temp_filepath, filepath)
+            write_digest(filepath, new_hash)
+            ingest_snapshot(filepath)
+            if os.path.abspath(latest_file) != os.path.abspath(filepath):
+                remove_snapshot(latest_file)
+            update_manifest(directory, name, new_entry)
+            print(f"data for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) updated in {filepath}")
+            return filepath
         else:
-           
-            urllib.request.urlretrieve(url, filepath)
-            print(f"data for  {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) dawnloaded in  {filepath}")
+            os.replace(temp_filepath, filepath)
+            write_digest(filepath, new_hash)
+            ingest_snapshot(filepath)
+            update_manifest(directory, name, new_entry)
+            print(f"data for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) dawnloaded in  {filepath}")
             return filepath
     except Exception as e:
-        print(f"rrror dawnloading data for  {REGIONS[ua_id]}: {e}")
+        print(f"rrror dawnloading data for  {name}: {e}")
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+        if raise_errors:
+            raise
         return None
 
 
+def read_last_week(filepath, tail_size=4096):
+    # only the tail of the snapshot is needed to know where it ends
+    with open(filepath, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - tail_size))
+        tail = f.read().decode('utf-8', errors='replace')
+    for line in reversed(tail.splitlines()):
+        parts = line.replace('<tt><pre>', '').split(',')
+        try:
+            return int(parts[0]), int(parts[1])
+        except (ValueError, IndexError):
+            continue
+    return None
 
-def download_all_regions_vhi(directory="vhi_data", delay=2):
-    print("starting to download data for all provincees...")
-    downloaded_files = []
-    
-   
-    for region_id in range(1, 28):
+def split_vhi_text(text):
+    head, sep, body = text.partition('<tt><pre>')
+    if not sep:
+        raise ValueError("no <tt><pre> block in the response")
+    header_lines = [line for line in head.splitlines() if line.strip()]
+    data_lines = [line.strip() for line in body.split('</pre>')[0].splitlines() if line.strip()]
+    return header_lines, data_lines
+
+def merge_vhi_lines(old_lines, new_lines):
+    # newer lines win for the same (Year, Week), so revised weeks are replaced
+    rows = {}
+    for line in old_lines + new_lines:
+        parts = line.split(',', 2)
         try:
-            
-            time.sleep(delay)
-            
-            file_path = download_vhi_data(region_id, directory)
-            if file_path:
-                downloaded_files.append(file_path)
+            key = (int(parts[0]), int(parts[1]))
+        except (ValueError, IndexError):
+            print(f"skipping malformed line: {line}")
+            continue
+        rows[key] = line
+    return [rows[key] for key in sorted(rows)]
+
+def write_vhi_snapshot(filepath, header_lines, data_lines):
+    data = ('\n'.join(header_lines) + '\n<tt><pre>' + '\n'.join(data_lines) + '\n</pre></tt>').encode('utf-8')
+    with open(filepath + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(filepath + '.tmp', filepath)
+    digest = hashlib.md5(data).hexdigest()
+    write_digest(filepath, digest)
+    return digest, len(data)
+
+
+def update_vhi_data(ua_id, directory="vhi_data", base_url=NOAA_URL, raise_errors=False, country=DEFAULT_COUNTRY):
+    country = get_country(country)
+    name = country.names[ua_id]
+    partition = country_directory(directory, country)
+    latest_file = latest_snapshot(partition, name)
+    last = read_last_week(latest_file) if latest_file else None
+    if last is None:
+        return download_vhi_data(ua_id, directory, base_url=base_url, raise_errors=raise_errors, country=country)
+
+    directory = partition
+    noaa_id = country.local_to_noaa[ua_id]
+    # the last stored year is fetched again, NOAA revises the most recent weeks
+    year1, year2 = last[0], datetime.now().year
+    url = f"{base_url}?country={country.code}&provinceID={noaa_id}&year1={year1}&year2={year2}&type=Mean"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f'vhi_{name}_{timestamp}.csv'
+    filepath = os.path.join(directory, filename)
+
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            _, new_lines = split_vhi_text(response.read().decode('utf-8'))
+
+        with open(latest_file, 'r', encoding='utf-8') as f:
+            header_lines, old_lines = split_vhi_text(f.read())
+        merged_lines = merge_vhi_lines(old_lines, new_lines)
+
+        if merged_lines == old_lines:
+            print(f"no new weeks for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) after {last[0]}/{last[1]},skip ")
+            return None
+
+        last_year = int(merged_lines[-1].split(',')[0])
+        header_lines[0] = re.sub(r'to \d{4}', f'to {last_year}', header_lines[0])
+        digest, size = write_vhi_snapshot(filepath, header_lines, merged_lines)
+        ingest_snapshot(filepath)
+        if os.path.abspath(latest_file) != os.path.abspath(filepath):
+            remove_snapshot(latest_file)
+        update_manifest(directory, name, {
+            'url': url,
+            'etag': None,
+            'last_modified': None,
+            'content_length': size,
+            'digest': digest,
+            'file': filename,
+            'fetched': datetime.now().isoformat(timespec='seconds'),
+        })
+        print(f"data for  {name} (ID: {ua_id}, NOAA ID: {noaa_id}) extended with "
+              f"{len(merged_lines) - len(old_lines)} new weeks in {filepath}")
+        return filepath
+    except Exception as e:
+        print(f"rrror updating data for  {name}: {e}")
+        if raise_errors:
+            raise
+        return None
+
+
+class TokenBucket:
+    # allows `rate` requests per second on average and bursts of up to `capacity`
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+
+def get_host_bucket(url, rate, capacity=1):
+    # one bucket per host so every worker talking to NOAA shares the same budget
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_buckets_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None or bucket.rate != rate or bucket.capacity != capacity:
+            bucket = TokenBucket(rate, capacity)
+            _host_buckets[host] = bucket
+    return bucket
+
+
+def is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in (408, 429) or error.code >= 500
+    return isinstance(error, (urllib.error.URLError, OSError))
+
+
+def fetch_region_with_retry(region_id, directory="vhi_data", base_url=NOAA_URL, bucket=None, retries=3, backoff=1.0, incremental=False, country=DEFAULT_COUNTRY, fetch=None):
+    # fetch stands in for the downloader, e.g. lab3's that reports to streamlit
+    fetch = fetch or (update_vhi_data if incremental else download_vhi_data)
+    country = get_country(country)
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            file_path = fetch(region_id, directory, base_url=base_url, raise_errors=True, country=country)
+            error = None
+            break
         except Exception as e:
-            print(f"error downloading for the province  {region_id}: {e}")
-    
-    print(f"download completed.{len(downloaded_files)} files")
+            if attempt > retries or not is_retryable(e):
+                file_path, error = None, str(e)
+                break
+            wait = backoff * 2 ** (attempt - 1)
+            retry_after = getattr(e, 'headers', None) and e.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                wait = max(wait, int(retry_after))
+            print(f"retrying {country.names[region_id]} in {wait:.1f}s (attempt {attempt} of {retries + 1})")
+            time.sleep(wait)
+
+    return {
+        'region_id': region_id,
+        'region': country.names[region_id],
+        'file': file_path,
+        'attempts': attempt,
+        'seconds': time.perf_counter() - started,
+        'error': error,
+    }
+
+
+def download_regions(region_ids, directory="vhi_data", delay=2, workers=4, burst=1, retries=3, backoff=1.0, base_url=NOAA_URL, incremental=False, country=DEFAULT_COUNTRY):
+    # `delay` is the average gap between two requests to the same host,
+    # enforced by a token bucket instead of sleeping before every region
+    bucket = get_host_bucket(base_url, 1 / delay, burst) if delay else None
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(fetch_region_with_retry, region_id, directory, base_url, bucket, retries, backoff, incremental, country)
+            for region_id in region_ids
+        ]
+        return [future.result() for future in futures]
+
+
+def print_download_report(report):
+    print(f"\n{'region':<20} {'time, s':>8} {'attempts':>9}  status")
+    for row in report:
+        if row['error']:
+            status = f"error: {row['error']}"
+        elif row['file']:
+            status = "updated"
+        else:
+            status = "unchanged"
+        print(f"{row['region']:<20} {row['seconds']:>8.2f} {row['attempts']:>9}  {status}")
+
+
+def download_all_regions_vhi(directory="vhi_data", delay=2, workers=4, burst=1, retries=3, backoff=1.0, base_url=NOAA_URL, incremental=False, country=DEFAULT_COUNTRY):
+    country = get_country(country)
+    print(f"starting to download data for all provincees of {country.name}...")
+    started = time.perf_counter()
+
+    report = download_regions(sorted(country.names), directory, delay, workers, burst, retries, backoff, base_url, incremental, country)
+    downloaded_files = [row['file'] for row in report if row['file']]
+
+    print_download_report(report)
+    print(f"download completed.{len(downloaded_files)} files in {time.perf_counter() - started:.1f}s")
     return downloaded_files
+
+
+def compact_snapshots(directory="vhi_data", country=DEFAULT_COUNTRY, dry_run=False):
+    # keeps the newest snapshot per region by the timestamp in its name and
+    # removes older snapshots, temp_ leftovers of broken downloads, *.tmp files
+    # and sidecars whose csv is gone; the manifest and parse cache are then
+    # brought in line with what is left
+    directory = country_directory(directory, country)
+    if not os.path.isdir(directory):
+        print(f"no snapshot directory {directory}")
+        return []
+
+    manifest = load_manifest(directory)
+    newest = {}
+    for match in filter(None, map(SNAPSHOT_PATTERN.match, os.listdir(directory))):
+        name, base = match.group(1), match.group(0)
+        if name not in newest or snapshot_time(base) > snapshot_time(newest[name]):
+            newest[name] = base
+    keep = {base: name for name, base in newest.items()}
+
+    removed = []
+    for base in sorted(os.listdir(directory)):
+        path = os.path.join(directory, base)
+        if not os.path.isfile(path) or base in (MANIFEST_NAME, PARSE_CACHE_NAME, SQLITE_NAME):
+            continue
+        snapshot = base
+        for suffix in ('.md5', STORE_SUFFIX):
+            if snapshot.endswith(suffix):
+                snapshot = snapshot[:-len(suffix)]
+        if (base.startswith('temp_') or base.endswith('.tmp')
+                or (snapshot.startswith('vhi_') and snapshot.endswith('.csv') and snapshot not in keep)):
+            removed.append(path)
+
+    freed = sum(os.path.getsize(path) for path in removed)
+    if dry_run:
+        print(f"would remove {len(removed)} files ({freed / 2**20:.1f} MB), keeping {len(keep)} snapshots")
+        return removed
+
+    for path in removed:
+        os.remove(path)
+    catalog = {}
+    for base, name in keep.items():
+        entry = manifest.get(name, {})
+        if entry.get('file') != base:
+            path = os.path.join(directory, base)
+            entry = {
+                'url': None,
+                'etag': None,
+                'last_modified': None,
+                'content_length': os.path.getsize(path),
+                'digest': read_digest(path),
+                'file': base,
+                'fetched': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds'),
+            }
+        catalog[name] = entry
+    with _manifest_lock:
+        write_json_atomic(os.path.join(directory, MANIFEST_NAME), catalog)
+    update_parse_cache(directory, {}, keep=set(keep))
+    print(f"removed {len(removed)} files ({freed / 2**20:.1f} MB), kept {len(keep)} snapshots")
+    return removed
     
     
 #-----------------------------------------------------------------------------    
  
-def read_vhi_files(directory="vhi_data"):
-    all_files = glob.glob(os.path.join(directory, "vhi_*.csv"))
-    df_list = []
+STORE_SUFFIX = '.npy'
+STORE_DTYPE = np.dtype([
+    ('Year', '<i2'), ('Week', '<i1'),
+    ('SMN', '<f8'), ('SMT', '<f8'), ('VCI', '<f8'), ('TCI', '<f8'), ('VHI', '<f8'),
+    ('Region', '<i2'),
+])
+
+VHI_COLUMNS = ['Year', 'Week', 'SMN', 'SMT', 'VCI', 'TCI', 'VHI']
+
+def parse_vhi_file(filename):
+    with open(filename, 'r') as file:
+        text = file.read()
+
+    header, _, text = text.partition('\n')
+    region_id = int(header.split('Province=')[1].split(':')[0].strip())
+    body = text.partition('\n')[2].replace('<tt><pre>', '', 1).split('</pre>')[0]
+
+    # every row ends with a comma, the empty 8th field is simply not read
+    try:
+        df = pd.read_csv(io.StringIO(body), header=None, names=VHI_COLUMNS + ['trailing'],
+                         usecols=VHI_COLUMNS, skipinitialspace=True)
+    except (pd.errors.ParserError, ValueError):
+        df = None
+
+    if (df is None or df.isna().any().any()
+            or df['Year'].dtype.kind != 'i' or df['Week'].dtype.kind != 'i'
+            or any(df[name].dtype.kind not in 'if' for name in VHI_COLUMNS[2:])):
+        return parse_vhi_lines(body.splitlines(), region_id)
+
+    df['Region'] = region_id
+    return df
+
+def parse_vhi_lines(lines, region_id):
+    # slow path, only used when the bulk parser finds something it cannot read
+    data_rows = []
+    for line in lines:  
+
+        clean_line = (line.replace('<tt><pre>', '')
+                        .replace('</tt></pre>', '')
+                        .strip())
+        
+        if clean_line and not clean_line.startswith('<'):
+            values = [v.strip() for v in clean_line.split(',') if v.strip()]
+            if len(values) >= 7:  
+                try:
+    
+                    row = {
+                        'Year': int(values[0]),
+                        'Week': int(values[1]),
+                        'SMN': float(values[2]),
+                        'SMT': float(values[3]),
+                        'VCI': float(values[4]),
+                        'TCI': float(values[5]),
+                        'VHI': float(values[6]),
+                        'Region': region_id
+                    }
+                    data_rows.append(row)
+                except (ValueError, IndexError) as e:
+                    print(f"⚠ Error parsing line: {clean_line}")
+                    print(f"Error details: {e}")
+                    continue
+    
+    return pd.DataFrame(data_rows, columns=VHI_COLUMNS + ['Region'])
+
+def save_vhi_store(filename, df):
+    # typed columnar copy of a snapshot, written once at ingest time
+    records = np.empty(len(df), dtype=STORE_DTYPE)
+    for name in STORE_DTYPE.names:
+        records[name] = df[name].to_numpy()
+    store = filename + STORE_SUFFIX
+    with open(store + '.tmp', 'wb') as f:
+        np.save(f, records)
+    os.replace(store + '.tmp', store)
+
+INDEX_COLUMNS = ['SMN', 'SMT', 'VCI', 'TCI', 'VHI']
+VHI_SCHEMA = {'Year': 'int16', 'Week': 'int8', 'Region': 'int16', 'Region_Name': 'category'}
+
+def apply_vhi_schema(df, float32=False):
+    schema = {column: dtype for column, dtype in VHI_SCHEMA.items() if column in df.columns}
+    if float32:
+        schema.update({column: 'float32' for column in INDEX_COLUMNS if column in df.columns})
+    return df.astype(schema)
+
+def print_memory_report(df):
+    # what the same frame costs as int64/float64 with python strings for names
+    compact = df.memory_usage(deep=True, index=False).sum()
+    wide = len(df) * 8 * (len(df.columns) - ('Region_Name' in df.columns))
+    if 'Region_Name' in df.columns:
+        counts = df['Region_Name'].value_counts()
+        wide += len(df) * 8 + sum(count * sys.getsizeof(str(name)) for name, count in counts.items())
+    print(f"memory: {compact / 2**20:.2f} MB with the compact schema, "
+          f"{wide / 2**20:.2f} MB as int64/float64/object ({wide / compact:.1f}x less)")
+
+def load_vhi_store(filename):
+    store = filename + STORE_SUFFIX
+    if not os.path.exists(store):
+        return None
+    records = np.load(store, mmap_mode='r')
+    if records.dtype != STORE_DTYPE:
+        return None
+    return pd.DataFrame({name: np.array(records[name]) for name in STORE_DTYPE.names})
+
+def ingest_vhi_file(filename):
+    try:
+        df = parse_vhi_file(filename)
+    except Exception as e:
+        print(f"rrror reading file {filename}: {e}")
+        return pd.DataFrame()
+    if not df.empty:
+        try:
+            save_vhi_store(filename, df)
+        except OSError as e:
+            print(f"could not write columnar store for {filename}: {e}")
+    return df
+
+PARSE_CACHE_NAME = "parse_cache.json"
+_parse_cache_lock = threading.Lock()
+
+def file_fingerprint(filename):
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': read_digest(filename)}
+
+def load_parse_cache(directory="vhi_data"):
+    # file name -> fingerprint of the csv its columnar store was built from
+    path = os.path.join(directory, PARSE_CACHE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def update_parse_cache(directory, fingerprints, keep=None):
+    with _parse_cache_lock:
+        cache = load_parse_cache(directory)
+        cache.update(fingerprints)
+        if keep is not None:
+            cache = {name: fingerprint for name, fingerprint in cache.items() if name in keep}
+        write_json_atomic(os.path.join(directory, PARSE_CACHE_NAME), cache)
+
+def dataset_version(directory="vhi_data", fingerprints=None):
+    # changes whenever any snapshot is added, removed or replaced, so it can
+    # key in-process caches such as st.cache_data
+    if fingerprints is None:
+        fingerprints = {os.path.basename(f): file_fingerprint(f)
+                        for f in glob.glob(os.path.join(directory, "vhi_*.csv"))}
+    return hashlib.md5(json.dumps(fingerprints, sort_keys=True).encode('utf-8')).hexdigest()
+
+def ingest_snapshot(filepath):
+    # the downloader registers what it ingests, so the next read finds it cached
+    if not ingest_vhi_file(filepath).empty:
+        name = os.path.basename(filepath)
+        update_parse_cache(os.path.dirname(filepath), {name: file_fingerprint(filepath)})
+
+def load_vhi_file(filename, cached=False, verbose=True):
+    if verbose:
+        print(f"reading file: {filename}...")
+    try:
+        df = load_vhi_store(filename) if cached else None
+        if df is None:
+            df = ingest_vhi_file(filename)
+        
+        if not df.empty and verbose:
+            print(f"sucessfully processed data for region {df['Region'].iloc[0]}")
+        return df
+        
+    except Exception as e:
+        print(f"rrror reading file {filename}: {e}")
+        return pd.DataFrame()
+
+def read_vhi_files(directory="vhi_data", workers=1, chunksize=1, float32=False, verbose=True, country=DEFAULT_COUNTRY):
+    country = get_country(country)
+    directory = country_directory(directory, country)
+    all_files = sorted(glob.glob(os.path.join(directory, "vhi_*.csv")))
     
     if not all_files:
         print("no VHI data files found in the this dir")
         return pd.DataFrame()
 
-    for filename in all_files:
-        print(f"reading file: {filename}...")
+    # only files whose size, mtime or digest changed since their store was
+    # written are parsed again
+    cache = load_parse_cache(directory)
+    fingerprints = {os.path.basename(f): file_fingerprint(f) for f in all_files}
+    cached = [cache.get(os.path.basename(f)) == fingerprints[os.path.basename(f)] for f in all_files]
+    if verbose:
+        print(f"{sum(cached)} of {len(all_files)} files unchanged since last parse")
+
+    # files are independent, so with workers > 1 they are parsed in separate
+    # processes; map keeps the input order and everything is concatenated once
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(load_vhi_file, all_files, cached, itertools.repeat(verbose), chunksize=chunksize))
+    else:
+        frames = [load_vhi_file(filename, hit, verbose) for filename, hit in zip(all_files, cached)]
+
+    parsed = {os.path.basename(f): fingerprints[os.path.basename(f)]
+              for f, df, hit in zip(all_files, frames, cached) if not hit and not df.empty}
+    if parsed or len(cache) != len(fingerprints):
         try:
-            
-            with open(filename, 'r') as file:
-                lines = file.readlines()
-            
-           
-            region_id = int(lines[0].split('Province=')[1].split(':')[0].strip())
-           
-            data_rows = []
-            for line in lines[2:]:  
-        
-                clean_line = (line.replace('<tt><pre>', '')
-                                .replace('</tt></pre>', '')
-                                .strip())
-                
-                if clean_line and not clean_line.startswith('<'):
-                    values = [v.strip() for v in clean_line.split(',') if v.strip()]
-                    if len(values) >= 7:  
-                        try:
-            
-                            row = {
-                                'Year': int(values[0]),
-                                'Week': int(values[1]),
-                                'SMN': float(values[2]),
-                                'SMT': float(values[3]),
-                                'VCI': float(values[4]),
-                                'TCI': float(values[5]),
-                                'VHI': float(values[6]),
-                                'Region': region_id
-                            }
-                            data_rows.append(row)
-                        except (ValueError, IndexError) as e:
-                            print(f"⚠ Error parsing line: {clean_line}")
-                            print(f"Error details: {e}")
-                            continue
-            
-            
-            if data_rows:
-                df = pd.DataFrame(data_rows)
-                df_list.append(df)
-                print(f"sucessfully processed data for region {region_id}")
-            
-        except Exception as e:
-            print(f"rrror reading file {filename}: {e}")
+            update_parse_cache(directory, parsed, keep=set(fingerprints))
+        except OSError as e:
+            print(f"could not update parse cache: {e}")
+    df_list = [df for df in frames if not df.empty]
 
     if df_list:
-        print(f"\nsuccessfully loaded {len(df_list)} VHI data files")
         final_df = pd.concat(df_list, ignore_index=True)
         
-        final_df['Region_Name'] = final_df['Region'].map(NOAA_TO_UA).map(REGIONS)
-        
-     
-        print("\ndf structure:")
-        print("=" * 80)
-        print("\ncolumns in the df:")
-        print(final_df.columns.tolist())
-        
+        final_df['Region_Name'] = final_df['Region'].map(country.noaa_names)
+        final_df = apply_vhi_schema(final_df, float32)
         final_df = final_df.sort_values(['Year', 'Week', 'Region']).reset_index(drop=True)
         
-        print("\nfirst few rows of the data:")
-        print("=" * 80)
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', 1000)
-        print(final_df.head().to_string())
-        
-        print("\nsample of data for each region :")
-        print("=" * 80)
-        sample_by_region = (final_df.sort_values(['Year', 'Week'])
-                          .groupby('Region_Name')
-                          .first()
-                          .reset_index())
-        print(sample_by_region[['Region_Name', 'Year', 'Week', 'VHI']].to_string())
-        
-        
-        print("\ndata  validation:")
-        print("=" * 80)
-        print(f"total records: {len(final_df):,}")
-        print(f"year range: {final_df['Year'].min()} - {final_df['Year'].max()}")
-        print(f"week range: {final_df['Week'].min()} - {final_df['Week'].max()}")
-        print(f"num of regions: {final_df['Region'].nunique()}")
-        
-     
-        first_week = final_df.groupby('Region')['Week'].min()
-        if (first_week != 1).any():
-            print("\n some regions don't start with week 1:")
-            for region, week in first_week[first_week != 1].items():
-                print(f"region {REGIONS.get(region, region)}: starts from week {week}")
-        
+        if verbose:
+            print(f"\nsuccessfully loaded {len(df_list)} VHI data files")
+            print_vhi_overview(final_df)
         return final_df
     else:
         print("no files were successfully processed")
         return pd.DataFrame()
 
-def update_region_indices(df):
+def print_vhi_overview(final_df):
+     
+    print("\ndf structure:")
+    print("=" * 80)
+    print("\ncolumns in the df:")
+    print(final_df.columns.tolist())
+    
+    print("\nfirst few rows of the data:")
+    print("=" * 80)
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', 1000)
+    print(final_df.head().to_string())
+    
+    print("\nsample of data for each region :")
+    print("=" * 80)
+    sample_by_region = (final_df.sort_values(['Year', 'Week'])
+                      .groupby('Region_Name', observed=True)
+                      .first()
+                      .reset_index())
+    print(sample_by_region[['Region_Name', 'Year', 'Week', 'VHI']].to_string())
+    
+    
+    print("\ndata  validation:")
+    print("=" * 80)
+    print(f"total records: {len(final_df):,}")
+    print(f"year range: {final_df['Year'].min()} - {final_df['Year'].max()}")
+    print(f"week range: {final_df['Week'].min()} - {final_df['Week'].max()}")
+    print(f"num of regions: {final_df['Region'].nunique()}")
+    print_memory_report(final_df)
+    
+ 
+    first_week = final_df.groupby('Region')['Week'].min()
+    if (first_week != 1).any():
+        print("\n some regions don't start with week 1:")
+        names = final_df.drop_duplicates('Region').set_index('Region')['Region_Name']
+        for region, week in first_week[first_week != 1].items():
+            print(f"region {names.get(region, region)}: starts from week {week}")
+
+def update_region_indices(df, verbose=True, country=DEFAULT_COUNTRY):
     
     if 'Region' not in df.columns:
         print(" 'Region' column not found in df")
         return df
     
-    print("updating region indices...")
-    df['Region'] = df['Region'].map(NOAA_TO_UA)
-    df['Region_Name'] = df['Region'].map(REGIONS)
-    print("region indices updated successfully")
+    if verbose:
+        print("updating region indices...")
+    country = get_country(country)
+    df['Region'] = country.to_local(df['Region'].to_numpy()).astype(VHI_SCHEMA['Region'])
+    df['Region_Name'] = df['Region'].map(country.names).astype(VHI_SCHEMA['Region_Name'])
+    if verbose:
+        print("region indices updated successfully")
     return df
 
-def get_vhi_for_region_year(df, region_id, year):
+CUBE_WEEKS = 53
+
+class VHICube:
+    # dense (region, year, week) array per index with NaN for missing weeks,
+    # so a region/year lookup is a slice instead of a scan of the whole frame
+    def __init__(self, regions, first_year, arrays, names=None):
+        self.regions = regions
+        self.region_pos = {int(region): i for i, region in enumerate(regions)}
+        self.names = names or {}
+        self.first_year = first_year
+        self.last_year = first_year + next(iter(arrays.values())).shape[1] - 1
+        self.arrays = arrays
+        self.summaries = {}
+
+    def summary(self, index='VHI'):
+        if index not in self.summaries:
+            self.summaries[index] = VHISummary(self.arrays[index])
+        return self.summaries[index]
+
+    def region_positions(self, region_ids):
+        return np.array(sorted({self.region_pos[r] for r in region_ids if r in self.region_pos}), dtype=np.intp)
+
+    def year_positions(self, years):
+        return np.array(sorted({y - self.first_year for y in years if self.first_year <= y <= self.last_year}), dtype=np.intp)
+
+    def select(self, index, region_ids, years):
+        return self.arrays[index][np.ix_(self.region_positions(region_ids), self.year_positions(years))]
+
+    def to_frame(self, index, region_ids, years, columns=('Year', 'Week', 'Region')):
+        # back to the row layout of read_vhi_files, ordered by Year, Week, Region
+        region_pos = self.region_positions(region_ids)
+        year_pos = self.year_positions(years)
+        slab = self.arrays[index][np.ix_(region_pos, year_pos)].transpose(1, 2, 0)
+        y, w, r = np.nonzero(~np.isnan(slab))
+        frame = pd.DataFrame({
+            'Year': (year_pos[y] + self.first_year).astype(VHI_SCHEMA['Year']),
+            'Week': (w + 1).astype(VHI_SCHEMA['Week']),
+            'Region': self.regions[region_pos[r]],
+            index: slab[y, w, r],
+        })
+        return frame[list(columns) + [index]]
+
+EXACT_LIMIT = 100_000
+
+class VHISummary:
+    # per (region, year) count/min/max/sum plus a fixed-bin histogram sketch.
+    # VCI/TCI/VHI are bounded (0..100, -1 for missing weeks), so equal bins are
+    # an exactly mergeable quantile sketch: histograms of any cells just add up.
+    # 1.0 wide bins in uint8 (a cell holds at most 53 weeks) are 102 B per
+    # cell against 424 B of float64 weeks; the median lands in the right bin,
+    # so it is off by about a bin at most (more only when the two middle
+    # values of an even count are far apart)
+    def __init__(self, values, low=-1.0, high=101.0, bin_width=1.0):
+        valid = ~np.isnan(values)
+        self.low = low
+        self.bin_width = bin_width
+        self.bins = int(np.ceil((high - low) / bin_width))
+
+        self.count = valid.sum(axis=2)
+        self.min = np.where(valid, values, np.inf).min(axis=2)
+        self.max = np.where(valid, values, -np.inf).max(axis=2)
+        self.sum = np.where(valid, values, 0).sum(axis=2, dtype=np.float64)
+
+        r, y, w = np.nonzero(valid)
+        bin_ids = np.clip(((values[r, y, w] - low) / bin_width).astype(np.intp), 0, self.bins - 1)
+        cells = values.shape[0] * values.shape[1]
+        flat = (r * values.shape[1] + y) * self.bins + bin_ids
+        self.hist = (np.bincount(flat, minlength=cells * self.bins)
+                       .reshape(values.shape[0], values.shape[1], self.bins)
+                       .astype(np.uint8))
+
+    def merge(self, region_pos, year_pos):
+        cells = np.ix_(region_pos, year_pos)
+        count = int(self.count[cells].sum())
+        if count == 0:
+            return None
+        hist = self.hist[cells].sum(axis=(0, 1), dtype=np.int64)
+        minimum = self.min[cells].min()
+        maximum = self.max[cells].max()
+        return {
+            'min_vhi': minimum,
+            'max_vhi': maximum,
+            'mean_vhi': self.sum[cells].sum() / count,
+            'median_vhi': min(max(float(self.quantile(hist, 0.5)), minimum), maximum),
+        }
+
+    def quantile(self, hist, q):
+        return histogram_quantile(hist, q, self.low, self.bin_width)
+
+def histogram_quantile(hist, q, low, bin_width):
+    # q-th quantile of equal-width histograms along the last axis, with linear
+    # interpolation inside the bin that holds it; NaN where a histogram is empty
+    hist = np.asarray(hist, dtype=np.float64)
+    cdf = np.cumsum(hist, axis=-1)
+    count = cdf[..., -1:]
+    target = q * count
+    b = np.minimum((cdf < target).sum(axis=-1, keepdims=True), hist.shape[-1] - 1)
+    before = np.where(b > 0, np.take_along_axis(cdf, np.maximum(b - 1, 0), axis=-1), 0)
+    inside = np.take_along_axis(hist, b, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = low + (b + (target - before) / inside) * bin_width
+    return np.where(count > 0, value, np.nan)[..., 0]
+
+def build_vhi_cube(df, indices=INDEX_COLUMNS):
+    regions = np.sort(df['Region'].unique())
+    first_year = int(df['Year'].min())
+    shape = (len(regions), int(df['Year'].max()) - first_year + 1, CUBE_WEEKS)
+
+    r = np.searchsorted(regions, df['Region'].to_numpy())
+    y = df['Year'].to_numpy(np.intp) - first_year
+    w = df['Week'].to_numpy(np.intp) - 1
+
+    arrays = {}
+    for index in indices:
+        values = df[index].to_numpy()
+        arrays[index] = np.full(shape, np.nan, dtype=values.dtype)
+        arrays[index][r, y, w] = values
+    return VHICube(regions, first_year, arrays, region_names(df))
+
+def region_names(df):
+    # region id -> name as stored with the data, so labels are right for NOAA
+    # and local ids and for every country
+    if isinstance(df, VHICube):
+        return df.names
+    if isinstance(df, sqlite3.Connection):
+        return dict(df.execute("SELECT DISTINCT Region, Region_Name FROM vhi").fetchall())
+    if 'Region_Name' not in df.columns:
+        return {}
+    seen = df.drop_duplicates('Region')
+    return dict(zip(seen['Region'].tolist(), seen['Region_Name'].astype(object).tolist()))
+
+def get_vhi_for_region_year(df, region_id, year, verbose=True):
     
-    if 'Region' not in df.columns or 'Year' not in df.columns:
+    if isinstance(df, VHICube):
+        result = df.to_frame('VHI', [region_id], [year], columns=['Week'])
+    elif isinstance(df, sqlite3.Connection):
+        result = pd.read_sql_query(SQL_VHI_REGION_YEAR, df, params=(region_id, year))
+    elif 'Region' not in df.columns or 'Year' not in df.columns:
         print("required columns not found in the df")
         return pd.DataFrame()
-    
-    result = df[(df['Region'] == region_id) & (df['Year'] == year)][['Week', 'VHI']]
+    else:
+        result = df[(df['Region'] == region_id) & (df['Year'] == year)][['Week', 'VHI']]
+
+    if not verbose:
+        return result
+    name = region_names(df).get(region_id, 'Unknown')
     if result.empty:
-        print(f"no  data found for region {REGIONS.get(region_id, 'Unknown')} in year {year}")
+        print(f"no  data found for region {name} in year {year}")
     else:
-        print(f"VHI data for region {REGIONS.get(region_id, 'Unknown')} in {year}:")
+        print(f"VHI data for region {name} in {year}:")
         print(result.to_string(index=False))
     return result
 
-def get_vhi_extremes(df, region_ids, years):
-   
-    if 'Region' not in df.columns or 'Year' not in df.columns:
-        print("required columns not found in  df")
-        return None
-    
-    filtered_df = df[
-        (df['Region'].isin(region_ids)) & 
-        (df['Year'].isin(years))
-    ]
-    
-    if filtered_df.empty:
-        print(" no data found for those regions n years")
+def cube_vhi_extremes(cube, region_ids, years, exact=None):
+    # large selections are answered from the merged per (region, year)
+    # summaries, small ones (or exact=True) from the raw weeks in the cube
+    summary = cube.summary('VHI')
+    region_pos, year_pos = cube.region_positions(region_ids), cube.year_positions(years)
+    if exact is False or (exact is None and summary.count[np.ix_(region_pos, year_pos)].sum() > EXACT_LIMIT):
+        return summary.merge(region_pos, year_pos)
+
+    values = cube.arrays['VHI'][np.ix_(region_pos, year_pos)]
+    values = values[~np.isnan(values)]
+    if values.size == 0:
         return None
-    
-    stats = {
-        'min_vhi': filtered_df['VHI'].min(),
-        'max_vhi': filtered_df['VHI'].max(),
-        'mean_vhi': filtered_df['VHI'].mean(),
-        'median_vhi': filtered_df['VHI'].median()
+    return {
+        'min_vhi': values.min(),
+        'max_vhi': values.max(),
+        'mean_vhi': values.mean(),
+        'median_vhi': np.median(values)
     }
+
+def get_vhi_extremes(df, region_ids, years, exact=None, verbose=True):
+   
+    if isinstance(df, VHICube):
+        stats = cube_vhi_extremes(df, region_ids, years, exact)
+        if stats is None:
+            if verbose:
+                print(" no data found for those regions n years")
+            return None
+    elif isinstance(df, sqlite3.Connection):
+        stats = sql_vhi_extremes(df, region_ids, years)
+        if stats is None:
+            if verbose:
+                print(" no data found for those regions n years")
+            return None
+    else:
+        if 'Region' not in df.columns or 'Year' not in df.columns:
+            print("required columns not found in  df")
+            return None
+        
+        filtered_df = df[
+            (df['Region'].isin(region_ids)) & 
+            (df['Year'].isin(years))
+        ]
+        
+        if filtered_df.empty:
+            if verbose:
+                print(" no data found for those regions n years")
+            return None
+        
+        stats = {
+            'min_vhi': filtered_df['VHI'].min(),
+            'max_vhi': filtered_df['VHI'].max(),
+            'mean_vhi': filtered_df['VHI'].mean(),
+            'median_vhi': filtered_df['VHI'].median()
+        }
     
+    if not verbose:
+        return stats
+    names = region_names(df)
     print("\nVHI statistics:")
-    print(f"regions: {', '.join([REGIONS.get(r, 'Unknown') for r in region_ids])}")
+    print(f"regions: {', '.join([names.get(r, 'Unknown') for r in region_ids])}")
     print(f"years: {', '.join(map(str, years))}")
     print(f"minimum VHI: {stats['min_vhi']:.2f}")
     print(f"maximum VHI: {stats['max_vhi']:.2f}")
@@ -300,45 +1059,608 @@ def get_vhi_extremes(df, region_ids, years):
     
     return stats
     
-def get_vhi_range(df, region_ids, start_year, end_year):
+def get_vhi_range(df, region_ids, start_year, end_year, verbose=True):
     
-    result = df[(df['Region'].isin(region_ids)) & (df['Year'].between(start_year, end_year))][['Year', 'Week', 'Region', 'VHI']]
-    print(f"range for regions {region_ids} from {start_year} to {end_year}:")
-    print(result)
+    if isinstance(df, VHICube):
+        result = df.to_frame('VHI', region_ids, range(start_year, end_year + 1))
+    elif isinstance(df, sqlite3.Connection):
+        result = pd.read_sql_query(SQL_VHI_RANGE, df, params=(json.dumps([int(r) for r in region_ids]), start_year, end_year))
+    else:
+        result = df[(df['Region'].isin(region_ids)) & (df['Year'].between(start_year, end_year))][['Year', 'Week', 'Region', 'VHI']]
+    if verbose:
+        print(f"range for regions {region_ids} from {start_year} to {end_year}:")
+        print(result)
     return result    
 
 
-def find_extreme_droughts(df, threshold_percent=20):
+SQLITE_NAME = "vhi.sqlite"
+SQL_COLUMNS = ['Year', 'Week', 'Region', 'Region_Name'] + INDEX_COLUMNS
+
+# id lists are bound as one JSON parameter, so every statement has a fixed
+# text and sqlite3 reuses the compiled statement from its cache
+SQL_VHI_REGION_YEAR = "SELECT Week, VHI FROM vhi WHERE Region = ? AND Year = ? ORDER BY Week"
+SQL_VHI_RANGE = """
+    SELECT Year, Week, Region, VHI FROM vhi
+    WHERE Region IN (SELECT value FROM json_each(?)) AND Year BETWEEN ? AND ?
+    ORDER BY Year, Week, Region"""
+SQL_VHI_EXTREMES = """
+    SELECT COUNT(VHI), MIN(VHI), MAX(VHI), AVG(VHI) FROM vhi
+    WHERE Region IN (SELECT value FROM json_each(?)) AND Year IN (SELECT value FROM json_each(?))"""
+SQL_VHI_MEDIAN = """
+    SELECT AVG(VHI) FROM (
+        SELECT VHI FROM vhi
+        WHERE Region IN (SELECT value FROM json_each(?)) AND Year IN (SELECT value FROM json_each(?))
+        ORDER BY VHI LIMIT ? OFFSET ?)"""
+
+def export_vhi_sqlite(df, path, version=None):
+    # rebuilt in a temp file and swapped in, so readers never see half a table
+    temp_path = path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        columns = ', '.join(f"{c} {'TEXT' if c == 'Region_Name' else 'INTEGER' if c in ('Year', 'Week', 'Region') else 'REAL'}"
+                            for c in SQL_COLUMNS)
+        conn.execute(f"CREATE TABLE vhi ({columns})")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        data = df[SQL_COLUMNS].astype({'Region_Name': object})
+        conn.executemany(f"INSERT INTO vhi VALUES ({', '.join('?' * len(SQL_COLUMNS))})",
+                         data.itertuples(index=False, name=None))
+        conn.execute("CREATE INDEX vhi_region_year_week ON vhi (Region, Year, Week)")
+        conn.execute("INSERT INTO meta VALUES ('version', ?)", (version or '',))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temp_path, path)
+    return path
+
+def sqlite_version_of(path):
+    try:
+        conn = sqlite3.connect(f"file:{urllib.request.pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def open_vhi_sqlite(directory="vhi_data", workers=1, verbose=True, country=DEFAULT_COUNTRY):
+    # read-only connection to vhi.sqlite in the country partition, re-exported
+    # from the snapshots only when their dataset_version() changed
+    partition = country_directory(directory, country)
+    path = os.path.join(partition, SQLITE_NAME)
+    version = dataset_version(partition)
+    if not os.path.exists(path) or sqlite_version_of(path) != version:
+        df = read_vhi_files(directory, workers=workers, verbose=False, country=country)
+        if df.empty:
+            return None
+        export_vhi_sqlite(df, path, version)
+        if verbose:
+            print(f"exported {len(df)} rows to {path}")
+    return sqlite3.connect(f"file:{urllib.request.pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+
+def sql_vhi_extremes(conn, region_ids, years):
+    regions, years = json.dumps([int(r) for r in region_ids]), json.dumps([int(y) for y in years])
+    count, minimum, maximum, mean = conn.execute(SQL_VHI_EXTREMES, (regions, years)).fetchone()
+    if count == 0:
+        return None
+    # median: the middle row (odd count) or the average of the two middle rows
+    median, = conn.execute(SQL_VHI_MEDIAN, (regions, years, 2 - count % 2, (count - 1) // 2)).fetchone()
+    return {'min_vhi': minimum, 'max_vhi': maximum, 'mean_vhi': mean, 'median_vhi': median}
+
+def run_vhi_sql(conn, query, params=()):
+    cursor = conn.execute(query, params)
+    return pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description or ()])
+
+
+def find_extreme_droughts(df, threshold_percent=20, vhi_threshold=15, verbose=True):
     
-    results = []
-    total_regions = 25
+    # the region universe is whatever was loaded, not a fixed number
+    total_regions = df['Region'].nunique()
     threshold_regions = int(total_regions * threshold_percent / 100)
     
-    print(f"searching extreme doughts that touched more than  {threshold_percent}% regions...")
+    if verbose:
+        print(f"searching extreme doughts that touched more than  {threshold_percent}% regions...")
     
-    for year in df['Year'].unique():
-        year_data = df[df['Year'] == year]
-        drought_regions = year_data[year_data['VHI'] < 15]['Region'].unique()
-        
-        if len(drought_regions) >= threshold_regions:
-            results.append({
-                'year': year,
-                'affected_regions': len(drought_regions),
-                'regions': [REGIONS[r] for r in drought_regions if r in REGIONS],
-                'vhi_values': year_data[year_data['Region'].isin(drought_regions)]['VHI'].tolist()
-            })
+    # VHI = -1 is NOAA's marker for a missing week, not a drought
+    drought = df[(df['VHI'] < vhi_threshold) & (df['VHI'] >= 0)]
+    keys = ['Year', 'Region', 'Region_Name'] if 'Region_Name' in df.columns else ['Year', 'Region']
+    results = (drought.groupby(keys, observed=True)['VHI']
+                      .agg(drought_weeks='size', min_vhi='min', mean_vhi='mean')
+                      .reset_index())
+    results['affected_regions'] = results.groupby('Year')['Region'].transform('size')
+    results = results[results['affected_regions'] >= threshold_regions].reset_index(drop=True)
+    
+    if not verbose:
+        return results
     
-    if results:
-        print(f"found {len(results)} years with extreme droughts")
-        for result in results:
-            print(f"year {result['year']} - regions: {', '.join(result['regions'])} - VHI: {result['vhi_values']}")
+    if not results.empty:
+        years = results.groupby('Year').agg(
+            affected_regions=('affected_regions', 'first'),
+            min_vhi=('min_vhi', 'min'),
+            regions=(keys[-1], lambda names: ', '.join(map(str, names))),
+        )
+        print(f"found {len(years)} years with extreme droughts")
+        for year, row in years.iterrows():
+            print(f"year {year} - {row['affected_regions']} of {total_regions} regions: {row['regions']} - min VHI: {row['min_vhi']:.2f}")
     else:
         print("didnt find extreme droughts for this period")
     
     return results
 
 
-def main():
+def find_drought_episodes(df, vhi_threshold=15, min_weeks=1, verbose=True):
+    
+    data = df.sort_values(['Region', 'Year', 'Week'])
+    region = data['Region'].to_numpy()
+    year = data['Year'].to_numpy(np.int64)
+    week = data['Week'].to_numpy(np.int64)
+    vhi = data['VHI'].to_numpy()
+    below = (vhi < vhi_threshold) & (vhi >= 0)
+
+    # a row continues an episode if the previous row is the week right before it
+    # in the same region (week 52/53 -> week 1 of the next year included)
+    next_week = (((year[1:] == year[:-1]) & (week[1:] == week[:-1] + 1))
+                 | ((year[1:] == year[:-1] + 1) & (week[1:] == 1) & (week[:-1] >= 52)))
+    continues = np.concatenate([[False], (region[1:] == region[:-1]) & next_week & below[:-1]])
+
+    # run-length encoding: every below-threshold row that does not continue
+    # the previous one opens a new run; with no such rows every array is
+    # empty and the frame below keeps its columns
+    rows = np.flatnonzero(below)
+    run_starts = np.flatnonzero(~continues[rows])
+    first = rows[run_starts]
+    stops = np.r_[run_starts[1:], rows.size] if rows.size else run_starts
+    last = rows[stops - 1]
+
+    episodes = pd.DataFrame({
+        'Region': region[first],
+        'start_year': year[first],
+        'start_week': week[first],
+        'end_year': year[last],
+        'end_week': week[last],
+        'duration_weeks': stops - run_starts,
+        'min_vhi': np.minimum.reduceat(vhi[rows], run_starts) if rows.size else vhi[:0],
+    })
+    episodes['crosses_year'] = episodes['start_year'] != episodes['end_year']
+    if 'Region_Name' in data.columns:
+        episodes.insert(1, 'Region_Name', data['Region_Name'].to_numpy()[first])
+    episodes = episodes[episodes['duration_weeks'] >= min_weeks].reset_index(drop=True)
+
+    if not verbose:
+        return episodes
+    print(f"found {len(episodes)} drought episodes (VHI < {vhi_threshold} for at least {min_weeks} weeks)")
+    if not episodes.empty:
+        print(episodes.sort_values('duration_weeks', ascending=False).head(10).to_string(index=False))
+    return episodes
+
+
+CLIMATOLOGY_INDICES = ['VCI', 'TCI', 'VHI']
+CLIMATOLOGY_BASELINE = (1991, 2020)
+EMPTY_DIGEST = hashlib.md5().hexdigest()
+
+class VHIClimatology:
+    # per (region, week) running count/sum/sum of squares for every index
+    # over a baseline period, plus the baseline value of each year (a cell has
+    # one week per year, about 30 values) so percentiles are exact. Weeks that
+    # arrive later are folded in by update() and mean/std/percentiles are
+    # derived on demand without the raw frame
+    def __init__(self, baseline=CLIMATOLOGY_BASELINE, indices=CLIMATOLOGY_INDICES):
+        self.baseline = (int(baseline[0]), None if baseline[1] is None else int(baseline[1]))
+        self.indices = list(indices)
+        # length of the year axis of 'values'; an open baseline grows it
+        self.years = 0 if self.baseline[1] is None else self.baseline[1] - self.baseline[0] + 1
+        self.regions = np.empty(0, dtype=np.int64)
+        self.region_names = np.empty(0, dtype=object)
+        # last Year * CUBE_WEEKS + Week already counted, per region, and an md5
+        # of the rows counted so far, to notice revised or back-filled weeks
+        self.last = np.empty(0, dtype=np.int64)
+        self.digests = np.empty(0, dtype=object)
+        self.rebuilt = False
+        self.stats = {index: self.empty_stats(0) for index in self.indices}
+
+    def empty_stats(self, n):
+        return {
+            'count': np.zeros((n, CUBE_WEEKS), dtype=np.int64),
+            'sum': np.zeros((n, CUBE_WEEKS), dtype=np.float64),
+            'sumsq': np.zeros((n, CUBE_WEEKS), dtype=np.float64),
+            'values': np.full((n, CUBE_WEEKS, self.years), np.nan),
+        }
+
+    def add_years(self, years):
+        if years <= self.years:
+            return
+        for index in self.indices:
+            values = self.stats[index]['values']
+            grown = np.full(values.shape[:2] + (years,), np.nan)
+            grown[..., :self.years] = values
+            self.stats[index]['values'] = grown
+        self.years = years
+
+    def add_regions(self, regions, names):
+        new = ~np.isin(regions, self.regions)
+        if not new.any():
+            return
+        regions = np.concatenate([self.regions, regions[new]])
+        names = np.concatenate([self.region_names, names[new]])
+        order = np.argsort(regions, kind='stable')
+        self.regions = regions[order]
+        self.region_names = names[order]
+        self.last = np.concatenate([self.last, np.full(new.sum(), -1, dtype=np.int64)])[order]
+        self.digests = np.concatenate([self.digests, np.full(new.sum(), EMPTY_DIGEST, dtype=object)])[order]
+        for index in self.indices:
+            grown = self.empty_stats(new.sum())
+            for key, value in self.stats[index].items():
+                self.stats[index][key] = np.concatenate([value, grown[key]])[order]
+
+    def reset(self):
+        self.last[:] = -1
+        self.digests[:] = EMPTY_DIGEST
+        self.stats = {index: self.empty_stats(len(self.regions)) for index in self.indices}
+
+    def region_digests(self, r, ordinal, values, covered):
+        # md5 of the covered (week ordinal, index values) rows of every region in r
+        order = np.lexsort((ordinal, r))
+        r, ordinal, values, covered = r[order], ordinal[order], values[order], covered[order]
+        bounds = np.flatnonzero(np.r_[True, r[1:] != r[:-1], True])
+        digests = {}
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            keep = covered[a:b]
+            hasher = hashlib.md5(ordinal[a:b][keep].tobytes())
+            hasher.update(np.ascontiguousarray(values[a:b][keep]).tobytes())
+            digests[int(r[a])] = hasher.hexdigest()
+        return digests
+
+    def update(self, df):
+        # counts rows inside the baseline that are newer than what was already
+        # seen for their region. Pure appends are folded in; if any row at or
+        # below that point differs from what was counted (revised history,
+        # weeks missing from an earlier frame) everything is rebuilt from df.
+        # Returns the number of rows counted
+        start, end = self.baseline
+        year = df['Year'].to_numpy(np.int64)
+        in_base = year >= start
+        if end is not None:
+            in_base &= year <= end
+        if not in_base.any():
+            return 0
+        data = df.loc[in_base]
+        year = year[in_base]
+        week = data['Week'].to_numpy(np.int64)
+        region = data['Region'].to_numpy(np.int64)
+
+        seen = data.drop_duplicates('Region')
+        names = (seen['Region_Name'].astype(object).to_numpy() if 'Region_Name' in seen.columns
+                 else np.full(len(seen), None, dtype=object))
+        self.add_regions(seen['Region'].to_numpy(np.int64), names)
+
+        r = np.searchsorted(self.regions, region)
+        ordinal = year * CUBE_WEEKS + week
+        rows = np.column_stack([data[index].to_numpy(np.float64) for index in self.indices])
+        seen_digests = self.region_digests(r, ordinal, rows, ordinal <= self.last[r])
+        self.rebuilt = any(self.digests[pos] != digest for pos, digest in seen_digests.items())
+        if self.rebuilt:
+            self.reset()
+
+        new = ordinal > self.last[r]
+        if not new.any():
+            return 0
+        for pos, digest in self.region_digests(r, ordinal, rows, np.ones(len(r), dtype=bool)).items():
+            self.digests[pos] = digest
+        self.add_years(int(year[new].max()) - start + 1)
+        r = r[new]
+        w = week[new] - 1
+        y = year[new] - start
+        cell = r * CUBE_WEEKS + w
+        size = len(self.regions) * CUBE_WEEKS
+        shape = (len(self.regions), CUBE_WEEKS)
+        for i, index in enumerate(self.indices):
+            values = rows[new, i]
+            ok = values >= 0
+            c, v = cell[ok], values[ok]
+            stats = self.stats[index]
+            stats['count'] += np.bincount(c, minlength=size).reshape(shape)
+            stats['sum'] += np.bincount(c, weights=v, minlength=size).reshape(shape)
+            stats['sumsq'] += np.bincount(c, weights=v * v, minlength=size).reshape(shape)
+            stats['values'][r[ok], w[ok], y[ok]] = v
+        np.maximum.at(self.last, r, ordinal[new])
+        return int(new.sum())
+
+    def mean(self, index):
+        stats = self.stats[index]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return stats['sum'] / stats['count']
+
+    def std(self, index):
+        # sample std (ddof=1) like pandas; NaN for cells with fewer than 2 years
+        stats = self.stats[index]
+        n = stats['count']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (stats['sumsq'] - stats['sum'] ** 2 / n) / (n - 1)
+        return np.where(n > 1, np.sqrt(np.maximum(var, 0)), np.nan)
+
+    def percentile(self, index, q):
+        # exact q-th percentile of the baseline values of every cell, linear
+        # interpolation like pandas' quantile; NaN for empty cells
+        values = np.sort(self.stats[index]['values'], axis=2)
+        n = (~np.isnan(values)).sum(axis=2, keepdims=True)
+        position = q / 100 * np.maximum(n - 1, 0)
+        lo = np.floor(position).astype(np.intp)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        below = np.take_along_axis(values, lo, axis=2)
+        above = np.take_along_axis(values, hi, axis=2)
+        result = below + (above - below) * (position - lo)
+        return np.where(n > 0, result, np.nan)[..., 0]
+
+    def table(self, percentiles=(10, 50, 90)):
+        # one row per (Region, Week) with count/mean/std/percentiles per index
+        table = pd.DataFrame({
+            'Region': np.repeat(self.regions, CUBE_WEEKS).astype(VHI_SCHEMA['Region']),
+            'Region_Name': np.repeat(self.region_names, CUBE_WEEKS),
+            'Week': np.tile(np.arange(1, CUBE_WEEKS + 1), len(self.regions)).astype(VHI_SCHEMA['Week']),
+        })
+        for index in self.indices:
+            table[f'{index}_count'] = self.stats[index]['count'].ravel()
+            table[f'{index}_mean'] = self.mean(index).ravel()
+            table[f'{index}_std'] = self.std(index).ravel()
+            for q in percentiles:
+                table[f'{index}_p{q}'] = self.percentile(index, q).ravel()
+        columns = [f'{index}_count' for index in self.indices]
+        return table[table[columns].sum(axis=1) > 0].reset_index(drop=True)
+
+    def anomalies(self, df):
+        # adds <index>_anomaly and <index>_z to every row with one fancy-index
+        # lookup into the (region, week) tables; missing weeks and regions
+        # outside the climatology get NaN
+        region = df['Region'].to_numpy(np.int64)
+        r = np.minimum(np.searchsorted(self.regions, region), max(len(self.regions) - 1, 0))
+        known = (self.regions[r] == region) if len(self.regions) else np.zeros(len(df), dtype=bool)
+        w = df['Week'].to_numpy(np.intp) - 1
+
+        columns = {}
+        for index in self.indices:
+            values = df[index].to_numpy(np.float64)
+            mean = self.mean(index)[r, w] if len(self.regions) else np.nan
+            std = self.std(index)[r, w] if len(self.regions) else np.nan
+            valid = known & (values >= 0)
+            anomaly = np.where(valid, values - mean, np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                z = np.where(std > 0, anomaly / std, np.nan)
+            columns[f'{index}_anomaly'] = anomaly
+            columns[f'{index}_z'] = z
+        return df.assign(**columns)
+
+    def save(self, path):
+        arrays = {
+            'baseline': np.array([self.baseline[0], -1 if self.baseline[1] is None else self.baseline[1]]),
+            'indices': np.array(self.indices),
+            'regions': self.regions,
+            'region_names': self.region_names.astype(str),
+            'last': self.last,
+            'digests': self.digests.astype(str),
+        }
+        for index in self.indices:
+            for key, value in self.stats[index].items():
+                arrays[f'{index}_{key}'] = value
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            start, end = data['baseline'].tolist()
+            clim = cls((start, None if end == -1 else end), data['indices'].tolist())
+            clim.regions = data['regions']
+            clim.region_names = data['region_names'].astype(object)
+            clim.last = data['last']
+            clim.digests = data['digests'].astype(object)
+            for index in clim.indices:
+                clim.stats[index] = {key: data[f'{index}_{key}'] for key in ('count', 'sum', 'sumsq', 'values')}
+            clim.years = clim.stats[clim.indices[0]]['values'].shape[2] if clim.indices else clim.years
+        return clim
+
+def climatology_path(directory, baseline):
+    start, end = baseline
+    return os.path.join(directory, f"climatology_{start}_{'open' if end is None else end}.npz")
+
+def load_climatology(df, directory="vhi_data", baseline=CLIMATOLOGY_BASELINE, indices=CLIMATOLOGY_INDICES, verbose=True):
+    # the cached table lives next to the parsed snapshots; only weeks newer
+    # than the cache are added, and it is rebuilt when the indices, the
+    # region numbering (NOAA vs UA ids) or already counted weeks differ from
+    # the frame
+    path = climatology_path(directory, baseline)
+    clim = None
+    if os.path.exists(path):
+        try:
+            clim = VHIClimatology.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"cant read climatology {path}: {e}")
+    if clim is not None:
+        seen = df.drop_duplicates('Region')
+        names = dict(zip(clim.regions.tolist(), clim.region_names.tolist()))
+        stale = clim.indices != list(indices) or (
+            'Region_Name' in seen.columns
+            and any(names.get(int(r), n) != n for r, n in zip(seen['Region'], seen['Region_Name'].astype(object))))
+        if stale:
+            clim = None
+    if clim is None:
+        clim = VHIClimatology(baseline, indices)
+
+    added = clim.update(df)
+    if added:
+        os.makedirs(directory, exist_ok=True)
+        clim.save(path)
+    if verbose:
+        end = 'now' if baseline[1] is None else baseline[1]
+        change = f"rebuilt from {added} rows" if clim.rebuilt else f"{added} new rows added"
+        print(f"climatology {baseline[0]}-{end}: {len(clim.regions)} regions, {change}")
+    return clim
+
+
+def run_vhi_batch(df, queries):
+    
+    # every region/year style query is expanded into (query, Region, Year)
+    # cells, a single join against the data answers all of them and one
+    # groupby per query type produces the results
+    cells = []
+    droughts = []
+    for i, query in enumerate(queries):
+        query_id = query.get('id', i)
+        kind = query['type']
+        if kind == 'region_year':
+            cells.append((kind, query_id, query['region'], query['year']))
+        elif kind == 'range':
+            cells.extend((kind, query_id, region, year) for region in query['regions']
+                         for year in range(query['start_year'], query['end_year'] + 1))
+        elif kind == 'extremes':
+            cells.extend((kind, query_id, region, year) for region in query['regions'] for year in query['years'])
+        elif kind == 'droughts':
+            droughts.append((query_id, query.get('threshold_percent', 20)))
+        else:
+            raise ValueError(f"unknown query type: {kind}")
+
+    results = {}
+    if cells:
+        cells = pd.DataFrame(cells, columns=['type', 'query', 'Region', 'Year'])
+        cells = cells.astype({'Region': df['Region'].dtype, 'Year': df['Year'].dtype})
+        joined = cells.merge(df[['Region', 'Year', 'Week', 'VHI']], on=['Region', 'Year'])
+        by_type = dict(tuple(joined.groupby('type')))
+
+        if 'region_year' in by_type:
+            results['region_year'] = (by_type['region_year'][['query', 'Region', 'Year', 'Week', 'VHI']]
+                                      .sort_values(['query', 'Week'], kind='stable').reset_index(drop=True))
+        if 'range' in by_type:
+            results['range'] = (by_type['range'][['query', 'Year', 'Week', 'Region', 'VHI']]
+                                .sort_values(['query', 'Year', 'Week', 'Region'], kind='stable').reset_index(drop=True))
+        if 'extremes' in by_type:
+            results['extremes'] = (by_type['extremes'].groupby('query')['VHI']
+                                   .agg(min_vhi='min', max_vhi='max', mean_vhi='mean', median_vhi='median')
+                                   .reset_index())
+
+    if droughts:
+        # one drought table for all thresholds, each query is just a filter on it
+        table = find_extreme_droughts(df, 0, verbose=False)
+        total_regions = df['Region'].nunique()
+        results['droughts'] = pd.concat([
+            table[table['affected_regions'] >= int(total_regions * percent / 100)].assign(query=query_id)
+            for query_id, percent in droughts
+        ], ignore_index=True)
+
+    return results
+
+def write_batch_results(results, out_dir="vhi_results", fmt="csv"):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for kind, frame in results.items():
+        path = os.path.join(out_dir, f"{kind}.{fmt}")
+        if fmt == 'csv':
+            frame.to_csv(path, index=False)
+        elif fmt == 'json':
+            frame.to_json(path, orient='records', force_ascii=False)
+        elif fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            raise ValueError(f"unknown output format: {fmt}")
+        paths.append(path)
+    return paths
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="NOAA VHI data for the provinces of Ukraine. Without a command the interactive menu is started.")
+    parser.add_argument('--dir', default="vhi_data", help="directory with the vhi_*.csv snapshots")
+    parser.add_argument('--country', default=DEFAULT_COUNTRY, choices=sorted(COUNTRIES),
+                        help="NOAA country code, other countries than Ukraine are stored in <dir>/<code>")
+    commands = parser.add_subparsers(dest='command')
+
+    download = commands.add_parser('download', help="download data for all provinces")
+    download.add_argument('--incremental', action='store_true', help="fetch only the weeks after the stored ones")
+    download.add_argument('--workers', type=int, default=4)
+    download.add_argument('--delay', type=float, default=2, help="average seconds between requests")
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--out', default="vhi_results", help="directory the results are written to")
+    output.add_argument('--format', choices=['csv', 'json', 'parquet'], default='csv')
+    output.add_argument('--workers', type=int, default=1, help="processes used to parse the snapshots")
+    output.add_argument('--ua-ids', action='store_true', help="regions are given in the national numbering of the registry")
+
+    batch = commands.add_parser('batch', parents=[output], help="run a JSON file with a list of queries")
+    batch.add_argument('queries')
+    region_year = commands.add_parser('region-year', parents=[output], help="VHI of a region in a year")
+    region_year.add_argument('--region', type=int, required=True)
+    region_year.add_argument('--year', type=int, required=True)
+    extremes = commands.add_parser('extremes', parents=[output], help="VHI extremes for regions and years")
+    extremes.add_argument('--regions', type=int, nargs='+', required=True)
+    extremes.add_argument('--years', type=int, nargs='+', required=True)
+    year_range = commands.add_parser('range', parents=[output], help="VHI for regions over a range of years")
+    year_range.add_argument('--regions', type=int, nargs='+', required=True)
+    year_range.add_argument('--start-year', type=int, required=True)
+    year_range.add_argument('--end-year', type=int, required=True)
+    droughts = commands.add_parser('droughts', parents=[output], help="years with extreme droughts")
+    droughts.add_argument('--threshold-percent', type=int, default=20)
+    compact = commands.add_parser('compact', help="remove old snapshots, temp files and orphaned sidecars")
+    compact.add_argument('--dry-run', action='store_true', help="only list what would be removed")
+    sql = commands.add_parser('sql', help="run an SQL query against the vhi table of the SQLite export")
+    sql.add_argument('query')
+    sql.add_argument('params', nargs='*', help="values for the ? placeholders")
+    return parser
+
+def run_cli(args):
+    if args.command == 'download':
+        download_all_regions_vhi(args.dir, delay=args.delay, workers=args.workers, incremental=args.incremental,
+                                 country=args.country)
+        return 0
+
+    if args.command == 'compact':
+        for path in compact_snapshots(args.dir, args.country, args.dry_run):
+            print(path)
+        return 0
+
+    if args.command == 'sql':
+        conn = open_vhi_sqlite(args.dir, verbose=False, country=args.country)
+        if conn is None:
+            return 1
+        try:
+            print(run_vhi_sql(conn, args.query, args.params).to_string(index=False))
+        except sqlite3.Error as e:
+            print(f"query failed: {e}")
+            return 1
+        finally:
+            conn.close()
+        return 0
+
+    if args.command == 'batch':
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = json.load(f)
+    elif args.command == 'region-year':
+        queries = [{'type': 'region_year', 'region': args.region, 'year': args.year}]
+    elif args.command == 'extremes':
+        queries = [{'type': 'extremes', 'regions': args.regions, 'years': args.years}]
+    elif args.command == 'range':
+        queries = [{'type': 'range', 'regions': args.regions, 'start_year': args.start_year, 'end_year': args.end_year}]
+    else:
+        queries = [{'type': 'droughts', 'threshold_percent': args.threshold_percent}]
+
+    df = read_vhi_files(args.dir, workers=args.workers, verbose=False, country=args.country)
+    if df.empty:
+        return 1
+    if args.ua_ids:
+        df = update_region_indices(df, verbose=False, country=args.country)
+    for path in write_batch_results(run_vhi_batch(df, queries), args.out, args.format):
+        print(path)
+    return 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        return menu(args.dir, args.country)
+    return run_cli(args)
+
+
+def menu(directory="vhi_data", country=DEFAULT_COUNTRY):
+    country = get_country(country)
     print(ascii_art)
     df = None
     while True:
@@ -346,6 +1668,8 @@ def main():
         print("1 - Download data for a separate province")
         print("2 - Download data for all provinces")
         print("3 - Read and analyze VHI data")
+        print("4 - Fetch only new weeks for all provinces")
+        print("5 - Remove old snapshots and leftover files")
         print("0 - Exit")
         
         try:
@@ -355,19 +1679,20 @@ def main():
                 print("Exiting...")
                 break
             elif choice == 1:
-                print_regions()
-                province_id = int(input("Enter province number (1-27) or 0 to exit: "))
-                if 1 <= province_id <= 27:
-                    download_vhi_data(province_id)
+                print_regions(country)
+                province_id = int(input(f"Enter province number (1-{len(country.names)}) or 0 to exit: "))
+                if province_id in country.names:
+                    download_vhi_data(province_id, directory, country=country)
                 elif province_id == 0:
                     print("exiting...")
                 else:
-                    print("dumbass  enter a number from 1 to 27")
+                    print(f"dumbass  enter a number from 1 to {len(country.names)}")
             elif choice == 2:
-                download_all_regions_vhi()
+                download_all_regions_vhi(directory, country=country)
             elif choice == 3:
-                df = read_vhi_files()
-                if df is not None:
+                df = read_vhi_files(directory, country=country)
+                if df is not None and not df.empty:
+                    cube = build_vhi_cube(df)
                     while True:
                         print("\nVHI data analysis menu:")
                         print("1 - update region indices")
@@ -375,6 +1700,8 @@ def main():
                         print("3 - get VHI extremes for regions and years")
                         print("4 - Get VHI for a range of years")
                         print("5 - find extreme droughts")
+                        print("6 - find drought episodes")
+                        print("7 - weekly climatology and anomalies")
                         print("0 - return to main menu")
                         
                         sub_choice = int(input("enter num of operation: "))
@@ -382,29 +1709,43 @@ def main():
                         if sub_choice == 0:
                             break
                         elif sub_choice == 1:
-                            df = update_region_indices(df)
+                            df = update_region_indices(df, country=country)
+                            cube = build_vhi_cube(df)
                         elif sub_choice == 2:
                             region_id = int(input("enter region ID: "))
                             year = int(input("enter year: "))
-                            get_vhi_for_region_year(df, region_id, year)
+                            get_vhi_for_region_year(cube, region_id, year)
                         elif sub_choice == 3:
                             region_ids = list(map(int, input("Enter region IDs separated by space: ").split()))
                             years = list(map(int, input("Enter years separated by space: ").split()))
-                            get_vhi_extremes(df, region_ids, years)
+                            get_vhi_extremes(cube, region_ids, years)
                         elif sub_choice == 4:
                             region_ids = list(map(int, input("enter region IDs separated by space: ").split()))
                             start_year = int(input("enter start year: "))
                             end_year = int(input("enter end year: "))
-                            get_vhi_range(df, region_ids, start_year, end_year)
+                            get_vhi_range(cube, region_ids, start_year, end_year)
                         elif sub_choice == 5:
                             threshold = int(input("enter threshold percentage (default 20): ") or 20)
                             find_extreme_droughts(df, threshold)
+                        elif sub_choice == 6:
+                            min_weeks = int(input("enter minimal episode length in weeks (default 1): ") or 1)
+                            find_drought_episodes(df, min_weeks=min_weeks)
+                        elif sub_choice == 7:
+                            start_year = int(input(f"enter baseline start year (default {CLIMATOLOGY_BASELINE[0]}): ") or CLIMATOLOGY_BASELINE[0])
+                            end_year = int(input(f"enter baseline end year (default {CLIMATOLOGY_BASELINE[1]}): ") or CLIMATOLOGY_BASELINE[1])
+                            clim = load_climatology(df, country_directory(directory, country), (start_year, end_year))
+                            df = clim.anomalies(df)
+                            print(df[['Year', 'Week', 'Region', 'VHI', 'VHI_anomaly', 'VHI_z']].tail(10).to_string(index=False))
                         else:
-                            print("dumbass enter a number between 0 and 5")
+                            print("dumbass enter a number between 0 and 7")
+            elif choice == 4:
+                download_all_regions_vhi(directory, incremental=True, country=country)
+            elif choice == 5:
+                compact_snapshots(directory, country)
             else:
-                print("dumbass enter a number between 0 and 3")
+                print("dumbass enter a number between 0 and 5")
         except ValueError:
             print("dumbass enter an integer")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
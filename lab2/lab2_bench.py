@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import lab2
+
+# synthetic NOAA files for benchmarking the pipeline without the network:
+#   python lab2_bench.py --scales 27x43 108x43 432x43 --out bench.json
+#   python lab2_bench.py --baseline bench.json        (exit 1 on regressions)
+
+FIRST_YEAR = 1982
+WEEKS = 52
+
+
+def synthetic_country(provinces, code="SYN"):
+    return lab2.Country(code, "Synthetic", [
+        {'id': i, 'noaa_id': i, 'name': f"Province{i:05d}"} for i in range(1, provinces + 1)
+    ])
+
+
+def synthetic_rows(years, rng, missing_weeks=50):
+    # seasonal curve plus AR(1) noise, with one block of -1 weeks like the
+    # gap NOAA has at the end of 1984
+    n = years * WEEKS
+    t = np.arange(n)
+    season = np.sin(2 * np.pi * (t % WEEKS) / WEEKS)
+    noise = np.zeros(n)
+    shocks = rng.normal(0, 6, n)
+    for i in range(1, n):
+        noise[i] = 0.9 * noise[i - 1] + shocks[i]
+
+    smn = np.clip(0.15 + 0.1 * season + noise / 400, 0, 1)
+    smt = 270 + 15 * season + noise / 4
+    vci = np.clip(50 + 20 * season + noise, 0, 100)
+    tci = np.clip(50 - 15 * season + rng.normal(0, 10, n), 0, 100)
+    vhi = (vci + tci) / 2
+    values = np.column_stack([smn, smt, vci, tci, vhi])
+    if n > 3 * missing_weeks:
+        start = rng.integers(WEEKS, n - missing_weeks)
+        values[start:start + missing_weeks] = -1
+    return values
+
+
+def noaa_text(country, province_id, name, values, first_year=FIRST_YEAR):
+    # get_TS_admin.php response body for weekly rows starting at week 1 of first_year
+    lines = [
+        f"{first_year + i // WEEKS:4d},{i % WEEKS + 1:2d},{row[0]:6.3f},{row[1]:6.2f},{row[2]:6.2f},{row[3]:6.2f},{row[4]:6.2f},"
+        for i, row in enumerate(values)
+    ]
+    last_year = first_year + (len(values) - 1) // WEEKS
+    return (f"Mean data for {country}  Province= {province_id}: {name},  from {first_year} to {last_year}, weekly<br>for cropland area only<br>\n"
+            "year,week, SMN,SMT,VCI,TCI, VHI<br>\n"
+            "<tt><pre>" + "\n".join(lines) + "\n</pre></tt>")
+
+
+def write_noaa_file(path, country, province_id, name, years, rng, first_year=FIRST_YEAR):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(noaa_text(country, province_id, name, synthetic_rows(years, rng), first_year))
+
+
+def generate_dataset(directory, provinces, years, seed=0, code="SYN"):
+    # writes one snapshot per province into the country partition of
+    # `directory` and returns the Country that describes them
+    country = synthetic_country(provinces, code)
+    partition = lab2.country_directory(directory, country)
+    os.makedirs(partition, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for noaa_id, name in country.noaa_names.items():
+        write_noaa_file(os.path.join(partition, f"vhi_{name}_{timestamp}.csv"), code, noaa_id, name, years, rng)
+    return country
+
+
+def clear_derived(partition):
+    # back to bare csv files, so the next read parses everything again
+    for name in os.listdir(partition):
+        if not name.endswith('.csv'):
+            path = os.path.join(partition, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def measure(func, repeat=3, setup=None):
+    # best-of-n wall time, then one extra run under tracemalloc for the peak
+    # so the tracing overhead does not end up in the timings
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - started)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+
+def bench_scale(directory, provinces, years, repeat=3, workers=1, seed=0):
+    country = generate_dataset(directory, provinces, years, seed)
+    partition = lab2.country_directory(directory, country)
+    files = sorted(f for f in os.listdir(partition) if f.endswith('.csv'))
+    rows = provinces * years * WEEKS
+    size = sum(os.path.getsize(os.path.join(partition, f)) for f in files)
+
+    df = lab2.read_vhi_files(directory, verbose=False, country=country)
+    cube = lab2.build_vhi_cube(df)
+    region_ids = list(country.noaa_names)[:max(1, provinces // 4)]
+    year_list = list(range(FIRST_YEAR, FIRST_YEAR + years, 2))
+    mid_year = FIRST_YEAR + years // 2
+
+    steps = {
+        'ingest': (lambda: [lab2.ingest_vhi_file(os.path.join(partition, f)) for f in files],
+                   lambda: clear_derived(partition)),
+        'read_cold': (lambda: lab2.read_vhi_files(directory, workers=workers, verbose=False, country=country),
+                      lambda: clear_derived(partition)),
+        'read_cached': (lambda: lab2.read_vhi_files(directory, workers=workers, verbose=False, country=country), None),
+        'build_cube': (lambda: lab2.build_vhi_cube(df), None),
+        # queries run with verbose=False, so formatting the output is not timed
+        'region_year_df': (lambda: lab2.get_vhi_for_region_year(df, region_ids[0], mid_year, verbose=False), None),
+        'region_year_cube': (lambda: lab2.get_vhi_for_region_year(cube, region_ids[0], mid_year, verbose=False), None),
+        'extremes_df': (lambda: lab2.get_vhi_extremes(df, region_ids, year_list, verbose=False), None),
+        'extremes_cube': (lambda: lab2.get_vhi_extremes(cube, region_ids, year_list, verbose=False), None),
+        'range_df': (lambda: lab2.get_vhi_range(df, region_ids, mid_year - 5, mid_year + 5, verbose=False), None),
+        'range_cube': (lambda: lab2.get_vhi_range(cube, region_ids, mid_year - 5, mid_year + 5, verbose=False), None),
+        'extreme_droughts': (lambda: lab2.find_extreme_droughts(df, verbose=False), None),
+        'drought_episodes': (lambda: lab2.find_drought_episodes(df, verbose=False), None),
+    }
+
+    results = {}
+    for name, (func, setup) in steps.items():
+        seconds, peak, _ = measure(func, repeat, setup)
+        results[name] = {
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else None,
+            'peak_mb': peak / 2**20,
+        }
+        print(f"{provinces:>6} x {years:<3} {name:<18} {seconds * 1000:10.2f} ms {peak / 2**20:9.1f} MB", file=sys.stderr)
+
+    shutil.rmtree(partition)
+    return {'provinces': provinces, 'years': years, 'rows': rows, 'bytes': size, 'steps': results}
+
+
+def scaling_curves(scales):
+    # log-log slope of time over rows per step: ~1 is linear, >1 superlinear
+    curves = {}
+    rows = np.log([scale['rows'] for scale in scales])
+    for step in scales[0]['steps']:
+        seconds = [scale['steps'][step]['seconds'] for scale in scales]
+        curve = {'rows': [scale['rows'] for scale in scales], 'seconds': seconds}
+        if len(scales) > 1 and min(seconds) > 0:
+            curve['exponent'] = float(np.polyfit(rows, np.log(seconds), 1)[0])
+        curves[step] = curve
+    return curves
+
+
+def find_regressions(report, baseline, tolerance=0.25, min_seconds=0.001):
+    # steps that got slower than `tolerance` at a scale both runs measured;
+    # very short steps are skipped, their timings are mostly noise
+    previous = {(s['provinces'], s['years']): s['steps'] for s in baseline['scales']}
+    regressions = []
+    for scale in report['scales']:
+        old_steps = previous.get((scale['provinces'], scale['years']))
+        if old_steps is None:
+            continue
+        for step, new in scale['steps'].items():
+            old = old_steps.get(step)
+            if old is None or old['seconds'] < min_seconds:
+                continue
+            ratio = new['seconds'] / old['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append({'provinces': scale['provinces'], 'years': scale['years'],
+                                    'step': step, 'ratio': ratio})
+    return regressions
+
+
+def parse_scale(text):
+    provinces, _, years = text.lower().partition('x')
+    return int(provinces), int(years)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="scalability benchmark of the lab2 VHI pipeline on synthetic NOAA files")
+    parser.add_argument('--scales', nargs='+', type=parse_scale, default=[(27, 43), (108, 43), (432, 43)],
+                        help="provinces x years, e.g. 27x43")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help="processes for read_vhi_files")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dir', help="where the synthetic files are written (default: a temp dir)")
+    parser.add_argument('--out', help="JSON report path (default: stdout)")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a step counts as a regression")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="vhi_bench_")
+    try:
+        scales = [bench_scale(directory, provinces, years, args.repeat, args.workers, args.seed)
+                  for provinces, years in sorted(args.scales, key=lambda s: s[0] * s[1])]
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'workers': args.workers,
+        'scales': scales,
+        'curves': scaling_curves(scales),
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+        for r in regressions:
+            print(f"regression: {r['step']} at {r['provinces']}x{r['years']} is {r['ratio']:.2f}x slower", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
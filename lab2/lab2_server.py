@@ -0,0 +1,293 @@
+import argparse
+import collections
+import contextlib
+import hashlib
+import io
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import lab2
+import lab2_bench
+
+# stand-in for NOAA's get_TS_admin.php so the downloader can be measured
+# offline; the lab2 download functions take it through base_url:
+#   python lab2_server.py serve --port 8000 --latency 0.2 --error-rate 0.1
+#   python lab2_server.py loadtest --latency 0.05 --rate 5 --workers 8
+
+
+class FakeNOAA:
+    # synthetic weekly series per (country, province). change() revises the
+    # latest weeks and appends a new one, like NOAA does every week
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate=None, burst=1, years=43,
+                 first_year=lab2_bench.FIRST_YEAR, seed=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate = rate
+        self.burst = burst
+        self.years = years
+        self.first_year = first_year
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.series = {}
+        self.revisions = collections.Counter()
+        self.modified = {}
+        self.stats = collections.Counter()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/smcd/emb/vci/VH/get_TS_admin.php"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def values(self, key):
+        if key not in self.series:
+            rng = np.random.default_rng([self.seed, sum(map(ord, key[0])), key[1]])
+            self.series[key] = lab2_bench.synthetic_rows(self.years, rng)
+        values = self.series[key]
+        revision = self.revisions[key]
+        if revision:
+            # every revision appends a week and nudges the four before it
+            extra = values[-revision:] if revision <= len(values) else values
+            values = np.concatenate([values, extra])
+            values[-5:-1, 2:] = np.clip(values[-5:-1, 2:] + 0.01 * revision, 0, 100)
+        return values
+
+    def change(self, keys=None):
+        with self.lock:
+            for key in keys if keys is not None else list(self.series):
+                self.revisions[key] += 1
+                self.modified[key] = time.time()
+
+    def throttled(self):
+        if not self.rate:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return False
+            return True
+
+    def count(self, status, size=0):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[f'status_{status}'] += 1
+            self.stats['bytes'] += size
+
+    def reply(self, handler, status, body=b"", headers=None):
+        # counted before sending, the client may return before this thread does
+        self.count(status, len(body))
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(body)
+
+    def handle(self, handler):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        if self.throttled():
+            return self.reply(handler, 429, headers={'Retry-After': '1'})
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            return self.reply(handler, 503)
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(handler.path).query)
+        try:
+            country = query['country'][0]
+            province_id = int(query['provinceID'][0])
+            year1 = int(query.get('year1', [self.first_year])[0])
+            year2 = int(query.get('year2', [9999])[0])
+        except (KeyError, ValueError):
+            return self.reply(handler, 400)
+
+        key = (country, province_id)
+        with self.lock:
+            values = self.values(key)
+            modified = self.modified.setdefault(key, time.time())
+        years = self.first_year + np.arange(len(values)) // lab2_bench.WEEKS
+        rows = (years >= max(year1, self.first_year)) & (years <= year2)
+        first = int(np.argmax(rows)) if rows.any() else 0
+        # the window starts at week 1 of a year, so week numbers stay right
+        text = lab2_bench.noaa_text(country, province_id, f"Province{province_id:05d}",
+                                    values[first:first + int(rows.sum())], int(years[first]))
+        body = text.encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        headers = {'ETag': etag, 'Last-Modified': formatdate(modified, usegmt=True),
+                   'Content-Type': 'text/html; charset=utf-8'}
+        if self.not_modified(handler.headers, etag, modified):
+            return self.reply(handler, 304, headers=headers)
+        self.reply(handler, 200, body, headers)
+
+    @staticmethod
+    def not_modified(request_headers, etag, modified):
+        # If-None-Match wins when both are sent (RFC 9110 13.2.2); the
+        # Last-Modified date only has whole seconds, so compare on those
+        if request_headers.get('If-None-Match') is not None:
+            return request_headers['If-None-Match'] == etag
+        since = request_headers.get('If-Modified-Since')
+        if since is None:
+            return False
+        try:
+            return int(modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+
+def refresh(server, directory, incremental=False, **options):
+    # one download round; returns timing, request counts and per-region outcome
+    before = server.stats.copy()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = lab2.download_regions(sorted(lab2.REGIONS), directory, base_url=server.url,
+                                       incremental=incremental, **options)
+    seconds = time.perf_counter() - started
+    requests = server.stats - before
+    return {
+        'seconds': seconds,
+        'requests': requests['requests'],
+        'bytes': requests['bytes'],
+        'statuses': {name[len('status_'):]: n for name, n in sorted(requests.items()) if name.startswith('status_')},
+        'updated': sum(1 for row in report if row['file']),
+        'unchanged': sum(1 for row in report if not row['file'] and not row['error']),
+        'failed': sum(1 for row in report if row['error']),
+        'attempts': sum(row['attempts'] for row in report),
+        'slowest_region_seconds': max(row['seconds'] for row in report),
+    }
+
+
+def run_load_test(server, directory, **options):
+    # full mirror, refresh with nothing new, refresh after a content change,
+    # then an incremental refresh after another change
+    phases = {'initial': refresh(server, directory, **options)}
+    phases['unchanged'] = refresh(server, directory, **options)
+    server.change()
+    phases['changed'] = refresh(server, directory, **options)
+    server.change()
+    phases['incremental'] = refresh(server, directory, incremental=True, **options)
+    for name, phase in phases.items():
+        print(f"{name:<12} {phase['seconds']:7.2f}s {phase['requests']:>5} requests {phase['bytes'] / 1024:9.1f} KB "
+              f"updated {phase['updated']:>3} unchanged {phase['unchanged']:>3} failed {phase['failed']:>3} {phase['statuses']}",
+              file=sys.stderr)
+    return phases
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="local stand-in for the NOAA VHI endpoint and a load test of the lab2 downloader")
+    server = argparse.ArgumentParser(add_help=False)
+    server.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    server.add_argument('--jitter', type=float, default=0.0, help="extra random latency of up to this many seconds")
+    server.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    server.add_argument('--rate', type=float, help="requests per second before the server answers 429")
+    server.add_argument('--burst', type=int, default=1)
+    server.add_argument('--years', type=int, default=43)
+    server.add_argument('--seed', type=int, default=0)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', parents=[server], help="run the fake server until interrupted")
+    serve.add_argument('--host', default="127.0.0.1")
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--change-every', type=float, help="seconds between content changes")
+
+    load = commands.add_parser('loadtest', parents=[server], help="time full, unchanged, changed and incremental refreshes")
+    load.add_argument('--workers', type=int, default=4)
+    load.add_argument('--delay', type=float, default=0.0, help="client side average gap between requests")
+    load.add_argument('--client-burst', type=int, default=1)
+    load.add_argument('--retries', type=int, default=3)
+    load.add_argument('--backoff', type=float, default=0.1)
+    load.add_argument('--dir', help="download directory (default: a temp dir)")
+    load.add_argument('--out', help="JSON report path (default: stdout)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   rate=args.rate, burst=args.burst, years=args.years, seed=args.seed)
+
+    if args.command == 'serve':
+        with FakeNOAA(host=args.host, port=args.port, **options) as server:
+            print(f"serving {server.url}")
+            try:
+                while True:
+                    time.sleep(args.change_every or 3600)
+                    if args.change_every:
+                        server.change()
+                        print(f"content changed, {server.stats['requests']} requests so far")
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    directory = args.dir or tempfile.mkdtemp(prefix="vhi_load_")
+    try:
+        with FakeNOAA(**options) as server:
+            phases = run_load_test(server, directory, delay=args.delay, workers=args.workers,
+                                   burst=args.client_burst, retries=args.retries, backoff=args.backoff)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'server': options,
+        'client': {'workers': args.workers, 'delay': args.delay, 'burst': args.client_burst,
+                   'retries': args.retries, 'backoff': args.backoff},
+        'phases': phases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
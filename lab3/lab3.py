@@ -1,14 +1,16 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+import altair as alt
+import io
 import os
 import glob
-import time
-from datetime import datetime
-import urllib.request
-import hashlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 from matplotlib.patches import Patch
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 st.set_page_config(
     page_title="Ukraine VHI data analysis",
@@ -17,154 +19,312 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-REGIONS = {
-    1: 'Вінницька', 2: 'Волинська', 3: 'Дніпропетровська', 4: 'Донецька', 5: 'Житомирська',
-    6: 'Закарпатська', 7: 'Запорізька', 8: 'Івано-Франківська', 9: 'Київська', 10: 'Кіровоградська',
-    11: 'Луганська', 12: 'Львівська', 13: 'Миколаївська', 14: 'Одеська', 15: 'Полтавська',
-    16: 'Рівенська', 17: 'Сумська', 18: 'Тернопільська', 19: 'Харківська', 20: 'Херсонська',
-    21: 'Хмельницька', 22: 'Черкаська', 23: 'Чернівецька', 24: 'Чернігівська', 25: 'Республіка Крим',
-    26: 'Київ', 27: 'Севастополь',
-}
-
-NOAA_TO_UA = {
-    1: 22, 2: 24, 3: 23, 4: 25, 5: 3, 6: 4, 7: 8, 8: 19,
-    9: 20, 10: 21, 11: 9, 12: 26, 13: 10, 14: 11, 15: 12, 16: 13,
-    17: 14, 18: 15, 19: 16, 20: 27, 21: 17, 22: 18, 23: 6, 24: 1,
-    25: 2, 26: 7, 27: 5
-}
-
-def calculate_file_hash(filepath):
-    hasher = hashlib.md5()
-    with open(filepath, 'rb') as f:
-        buf = f.read()
-        hasher.update(buf)
-    return hasher.hexdigest()
-
-def download_vhi_data(ua_id, directory="vhi_data"):
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    noaa_id = list(NOAA_TO_UA.keys())[list(NOAA_TO_UA.values()).index(ua_id)]
-    url = f"https://www.star.nesdis.noaa.gov/smcd/emb/vci/VH/get_TS_admin.php?country=UKR&provinceID={noaa_id}&year1=1981&year2=2024&type=Mean"
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f'vhi_{REGIONS[ua_id]}_{timestamp}.csv'
-    filepath = os.path.join(directory, filename)
+# the province registry, downloader, parser and columnar stores are lab2's;
+# lab3 only adds the streamlit views on top of them
+LAB2_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lab2'))
+if LAB2_DIR not in sys.path:
+    sys.path.insert(0, LAB2_DIR)
+import lab2
 
+COUNTRY = lab2.get_country("UKR")
+REGIONS = COUNTRY.names
+NOAA_TO_UA = COUNTRY.noaa_to_local
+
+NOAA_URL = lab2.NOAA_URL
+
+def download_vhi_data(ua_id, directory="vhi_data", base_url=NOAA_URL, raise_errors=False, country=COUNTRY):
+    # lab2's downloader: the body is streamed to disk and hashed on the way,
+    # the .md5 sidecar and manifest are kept and requests are conditional, so
+    # snapshots are never read back to compare them; messages go to streamlit
+    country = lab2.get_country(country)
+    name = country.names[ua_id]
+    noaa_id = country.local_to_noaa[ua_id]
     try:
-        existing_files = glob.glob(os.path.join(directory, f'vhi_{REGIONS[ua_id]}_*.csv'))
-        if existing_files:
-            latest_file = max(existing_files, key=os.path.getctime)
-            latest_hash = calculate_file_hash(latest_file)
-            
-            temp_filepath = os.path.join(directory, f'temp_{filename}')
-            urllib.request.urlretrieve(url, temp_filepath)
-            new_hash = calculate_file_hash(temp_filepath)
-
-            if latest_hash == new_hash:
-                st.info(f"data for {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) alredy relevant,skip")
-                os.remove(temp_filepath)
-                return latest_file
-            else:
-                st.success(f"found new data for {REGIONS[ua_id]}, updating...")
-                os.remove(latest_file) 
-                os.rename(temp_filepath, filepath) 
-                st.success(f"data for {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) updated in {filepath}")
-                return filepath
-        else:
-            urllib.request.urlretrieve(url, filepath)
-            st.success(f"data for {REGIONS[ua_id]} (ID: {ua_id}, NOAA ID: {noaa_id}) dawnloaded in {filepath}")
-            return filepath
+        filepath = lab2.download_vhi_data(ua_id, directory, base_url=base_url, raise_errors=True, country=country)
     except Exception as e:
-        st.error(f"error dawnloading data for  {REGIONS[ua_id]}: {e}")
+        st.error(f"error dawnloading data for  {name}: {e}")
+        if raise_errors:
+            raise
         return None
 
-@st.cache_data
+    if filepath is None:
+        st.info(f"data for {name} (ID: {ua_id}, NOAA ID: {noaa_id}) alredy relevant,skip")
+        return lab2.latest_snapshot(lab2.country_directory(directory, country), name)
+    st.success(f"data for {name} (ID: {ua_id}, NOAA ID: {noaa_id}) dawnloaded in {filepath}")
+    return filepath
+
+VHI_SCHEMA = {**lab2.VHI_SCHEMA, 'Region_ID': 'int16'}
+
+
 def read_vhi_files(directory="vhi_data"):
-    all_files = glob.glob(os.path.join(directory, "vhi_*.csv"))
-    df_list = []
-    
-    if not all_files:
+    # lab2 parses the snapshots (or loads their columnar stores when the parse
+    # cache says they are unchanged); lab3 adds the UA ids on top
+    final_df = lab2.read_vhi_files(directory, verbose=False, country=COUNTRY)
+    if final_df.empty:
         st.warning("didnt find data files VHI for this dir")
         return pd.DataFrame()
 
-    for filename in all_files:
-        try:
-            with open(filename, 'r') as file:
-                lines = file.readlines()
-            
-            region_id = int(lines[0].split('Province=')[1].split(':')[0].strip())
-           
-            data_rows = []
-            for line in lines[2:]:  
-                clean_line = (line.replace('<tt><pre>', '')
-                                .replace('</tt></pre>', '')
-                                .strip())
-                
-                if clean_line and not clean_line.startswith('<'):
-                    values = [v.strip() for v in clean_line.split(',') if v.strip()]
-                    if len(values) >= 7:  
-                        try:
-                            row = {
-                                'Year': int(values[0]),
-                                'Week': int(values[1]),
-                                'SMN': float(values[2]),
-                                'SMT': float(values[3]),
-                                'VCI': float(values[4]),
-                                'TCI': float(values[5]),
-                                'VHI': float(values[6]),
-                                'Region': region_id
-                            }
-                            data_rows.append(row)
-                        except (ValueError, IndexError) as e:
-                            continue
-            
-            if data_rows:
-                df = pd.DataFrame(data_rows)
-                df_list.append(df)
-            
-        except Exception as e:
-            st.error(f"error reading file {filename}: {e}")
+    final_df = final_df.drop(final_df.loc[final_df['VHI'] == -1].index)
 
-    if df_list:
-        final_df = pd.concat(df_list, ignore_index=True)
-        
-        original_length = len(final_df)
-        final_df = final_df.drop(final_df.loc[final_df['VHI'] == -1].index)
-        
-        final_df['Region_ID'] = final_df['Region'].map(NOAA_TO_UA)
-        final_df['Region_Name'] = final_df['Region_ID'].map(REGIONS)
-        
-        final_df = final_df.sort_values(['Year', 'Week', 'Region_ID']).reset_index(drop=True)
-        
-        return final_df
-    else:
-        st.warning("no files were successfully processed")
-        return pd.DataFrame()
+    final_df['Region_ID'] = final_df['Region'].map(NOAA_TO_UA)
+    # provinces missing from the registry have no UA id to cast to int16
+    unknown = final_df['Region_ID'].isna()
+    if unknown.any():
+        ids = ', '.join(map(str, sorted(final_df.loc[unknown, 'Region'].unique())))
+        st.warning(f"skipped {int(unknown.sum())} rows of unknown NOAA provinces: {ids}")
+        final_df = final_df.drop(final_df.index[unknown])
+    final_df['Region_Name'] = final_df['Region_ID'].map(REGIONS)
+    final_df = final_df.astype(VHI_SCHEMA)
+
+    return final_df.sort_values(['Year', 'Week', 'Region_ID']).reset_index(drop=True)
+
+class VHIDataset:
+    # parsed snapshots plus what the widgets derive from them. One instance per
+    # data version is shared by every session through st.cache_resource, so it
+    # is never copied and must be treated as read-only
+    def __init__(self, df, version=None):
+        # rows are kept ordered by region, then (Year, Week): every region is
+        # one contiguous block whose Year * 53 + Week keys are sorted, so a
+        # week/year window is found by binary search instead of a scan
+        self.df = df.sort_values(['Region_ID', 'Year', 'Week'], kind='stable')
+        self.version = version
+        self.keys = self.df['Year'].to_numpy(np.int32) * 53 + self.df['Week'].to_numpy(np.int32)
+        names = self.df['Region_Name'].astype(object).to_numpy()
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        stops = np.r_[starts[1:], len(names)]
+        self.blocks = {names[a]: (int(a), int(b)) for a, b in zip(starts, stops)}
+        self.region_names = sorted(self.blocks)
+        self.min_year = int(df['Year'].min())
+        self.max_year = int(df['Year'].max())
+        self.build_prefix_sums()
+
+    def build_prefix_sums(self, indices=('VCI', 'TCI', 'VHI')):
+        # 2-D cumulative sums over (year, week) per region, with a zero row and
+        # column in front, so the sum of any year x week rectangle is 4 lookups
+        position = {name: i for i, name in enumerate(self.region_names)}
+        r = np.empty(len(self.df), dtype=np.intp)
+        for name, (start, stop) in self.blocks.items():
+            r[start:stop] = position[name]
+        y = self.df['Year'].to_numpy(np.intp) - self.min_year
+        w = self.df['Week'].to_numpy(np.intp) - 1
+        shape = (len(self.region_names), self.max_year - self.min_year + 1, 53)
+
+        def prefix(cells):
+            out = np.zeros((shape[0], shape[1] + 1, shape[2] + 1))
+            out[:, 1:, 1:] = cells.cumsum(axis=1).cumsum(axis=2)
+            return out
+
+        counts = np.zeros(shape)
+        np.add.at(counts, (r, y, w), 1)
+        self.count_cube = prefix(counts)
+        self.sum_cubes = {}
+        for index in indices:
+            sums = np.zeros(shape)
+            np.add.at(sums, (r, y, w), self.df[index].to_numpy(np.float64))
+            self.sum_cubes[index] = prefix(sums)
+
+    def window_total(self, cube, week_range, year_range):
+        y0 = max(year_range[0], self.min_year) - self.min_year
+        y1 = min(year_range[1], self.max_year) - self.min_year + 1
+        w0, w1 = max(week_range[0], 1) - 1, min(week_range[1], 53)
+        if y0 >= y1 or w0 >= w1:
+            return np.zeros(len(self.region_names))
+        return cube[:, y1, w1] - cube[:, y0, w1] - cube[:, y1, w0] + cube[:, y0, w0]
+
+    def region_means(self, index, week_range, year_range):
+        # mean of `index` per region over the window, regions without rows left out
+        counts = np.rint(self.window_total(self.count_cube, week_range, year_range))
+        sums = self.window_total(self.sum_cubes[index], week_range, year_range)
+        present = counts > 0
+        return pd.DataFrame({
+            'Region_Name': np.array(self.region_names, dtype=object)[present],
+            index: sums[present] / counts[present],
+        })
+
+    def bounds(self, region, week_range, year_range):
+        # [lo, hi) row positions of every year's week window inside the block
+        start, stop = self.blocks.get(region, (0, 0))
+        keys = self.keys[start:stop]
+        years = np.arange(year_range[0], year_range[1] + 1, dtype=np.int32) * 53
+        lo = np.searchsorted(keys, years + week_range[0])
+        hi = np.searchsorted(keys, years + week_range[1], side='right')
+        return start + lo, start + hi
+
+    def window(self, region, week_range, year_range):
+        lo, hi = self.bounds(region, week_range, year_range)
+        if len(lo) == 0:
+            return self.df.iloc[0:0]
+        if np.array_equal(lo[1:], hi[:-1]):
+            # back-to-back year windows (full weeks): a single view
+            return self.df.iloc[lo[0]:hi[-1]]
+        return self.df.iloc[ranges_to_positions(lo, hi)]
+
+def ranges_to_positions(lo, hi):
+    # concatenation of arange(lo[i], hi[i]) without a python loop
+    lengths = hi - lo
+    offsets = np.repeat(lo - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+    return offsets + np.arange(lengths.sum())
+
+@st.cache_resource(max_entries=2)
+def load_dataset(directory="vhi_data", version=None):
+    # version is only part of the cache key: a new fingerprint loads a new
+    # dataset and the oldest one is evicted
+    df = read_vhi_files(directory)
+    return VHIDataset(df, version) if not df.empty else None
+
+# views are keyed by (version, region, index, week range, year range); the
+# sort checkboxes and other widgets are not part of the key, so they never
+# trigger a redraw. max_entries keeps the least recently used views only
+@st.cache_data(max_entries=64, show_spinner=False)
+def time_series_pivot(_dataset, version, region, index, week_range, year_range):
+    return _dataset.window(region, week_range, year_range).pivot_table(
+        index='Week',
+        columns='Year',
+        values=index,
+        aggfunc='mean'
+    )
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_time_series(_dataset, version, region, index, week_range, year_range):
+    pivot_df = time_series_pivot(_dataset, version, region, index, week_range, year_range)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for year in pivot_df.columns:
+        ax.plot(pivot_df.index, pivot_df[year], label=str(year))
+    
+    ax.set_xlabel('week of year')
+    ax.set_ylabel(index)
+    ax.set_title(f'{index} for {region} in {year_range[0]}-{year_range[1]} роки')
+    ax.legend(title='Рік', bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.set_xlim(week_range[0], week_range[1])
+    
+    plt.tight_layout()
+    image = io.BytesIO()
+    fig.savefig(image, format='png', dpi=100)
+    plt.close(fig)
+    return image.getvalue()
+
+CHART_MAX_POINTS = 5000
+
+def lttb(x, y, threshold):
+    # largest-triangle-three-buckets: positions of `threshold` points that keep
+    # the visual shape of the line (first and last point always kept)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    keep = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    return np.array(keep)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def time_series_points(_dataset, version, region, index, week_range, year_range, max_points=CHART_MAX_POINTS):
+    # long (Week, Year, value) rows for the browser chart, every year's line
+    # reduced with LTTB when the window holds more than max_points points
+    pivot_df = time_series_pivot(_dataset, version, region, index, week_range, year_range)
+    per_year = max(3, max_points // max(1, len(pivot_df.columns)))
+    weeks = pivot_df.index.to_numpy(np.float64)
+    frames = []
+    for year in pivot_df.columns:
+        values = pivot_df[year].to_numpy(np.float64)
+        present = ~np.isnan(values)
+        x, y = weeks[present], values[present]
+        keep = lttb(x, y, per_year)
+        frames.append(pd.DataFrame({'Week': x[keep], 'Year': year, index: y[keep]}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Week', 'Year', index])
+
+def time_series_chart(points, index, region, week_range, year_range):
+    return (alt.Chart(points)
+            .mark_line()
+            .encode(
+                x=alt.X('Week:Q', title='week of year', scale=alt.Scale(domain=list(week_range))),
+                y=alt.Y(f'{index}:Q', title=index),
+                color=alt.Color('Year:N', title='Рік'),
+                tooltip=['Year:N', 'Week:Q', alt.Tooltip(f'{index}:Q', format='.2f')]
+            )
+            .properties(title=f'{index} for {region} in {year_range[0]}-{year_range[1]} роки', height=450)
+            .interactive())
 
-def download_all_regions_vhi(directory="vhi_data", delay=1):
+def comparison_chart(region_means, index, selected_region):
+    data = region_means.assign(selected=region_means['Region_Name'] == selected_region)
+    return (alt.Chart(data)
+            .mark_bar()
+            .encode(
+                x=alt.X('Region_Name:N', title='region', sort='-y'),
+                y=alt.Y(f'{index}:Q', title=f'average value {index}'),
+                color=alt.Color('selected:N', legend=None,
+                                scale=alt.Scale(domain=[False, True], range=['#1f77b4', '#ff7f0e'])),
+                tooltip=['Region_Name:N', alt.Tooltip(f'{index}:Q', format='.2f')]
+            )
+            .properties(title=f'comparison  by average values {index} betwen regions', height=500))
+
+def render_comparison(region_means, index, selected_region):
+    colors = ['#ff7f0e' if name == selected_region else '#1f77b4'
+              for name in region_means['Region_Name']]
+    
+    fig, ax = plt.subplots(figsize=(12, 8))
+    ax.bar(region_means['Region_Name'], region_means[index], color=colors)
+    ax.set_xlabel('region')
+    ax.set_ylabel(f'average value {index}')
+    ax.set_title(f'comparison  by average values {index} betwen regions')
+    ax.set_xticklabels(region_means['Region_Name'], rotation=45, ha='right')
+
+    legend_elements = [
+        Patch(facecolor='#1f77b4', label='other regions'),
+        Patch(facecolor='#ff7f0e', label=f'selected region: {selected_region}')
+    ]
+    ax.legend(handles=legend_elements, loc='upper right')
+
+    plt.tight_layout()
+    st.pyplot(fig)
+    plt.close(fig)
+
+def download_all_regions_vhi(directory="vhi_data", delay=1, workers=4, burst=1, retries=3, backoff=1.0, base_url=NOAA_URL):
     with st.spinner("dawnloading data for all regions..."):
-        downloaded_files = []
         progress_bar = st.progress(0)
-        
+        bucket = lab2.get_host_bucket(base_url, 1 / delay, burst) if delay else None
+
+        # worker threads need the script context to be allowed to call st.*
+        ctx = get_script_run_ctx()
+        report = []
         total_regions = len(REGIONS)
-        for i, region_id in enumerate(range(1, 28)):
-            try:
-                time.sleep(delay)
-                file_path = download_vhi_data(region_id, directory)
-                if file_path:
-                    downloaded_files.append(file_path)
+        with ThreadPoolExecutor(max_workers=max(1, workers),
+                                initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+            futures = [
+                pool.submit(lab2.fetch_region_with_retry, region_id, directory, base_url, bucket, retries, backoff,
+                            fetch=download_vhi_data)
+                for region_id in sorted(REGIONS)
+            ]
+            for i, future in enumerate(as_completed(futures)):
+                row = future.result()
+                if row['error']:
+                    st.error(f"error dawnloading for region {row['region']}: {row['error']}")
+                report.append(row)
                 progress_bar.progress((i + 1) / total_regions)
-            except Exception as e:
-                st.error(f"error dawnloading for region {region_id}: {e}")
-        
+
+        downloaded_files = [row['file'] for row in report if row['file']]
         st.success(f"dawnloading ended. {len(downloaded_files)} files")
         progress_bar.empty()
+        st.dataframe(pd.DataFrame(report)[['region', 'seconds', 'attempts', 'error']], use_container_width=True)
     return downloaded_files
 
 def init_session_state():
     if 'data_loaded' not in st.session_state:
         st.session_state.data_loaded = False
     
+    if 'chart_backend' not in st.session_state:
+        st.session_state.chart_backend = 'interactive'
+    
     if 'selected_index' not in st.session_state:
         st.session_state.selected_index = 'VHI'
     
@@ -183,7 +343,7 @@ def init_session_state():
     if 'descending_sort' not in st.session_state:
         st.session_state.descending_sort = False
 
-def reset_filters():
+def reset_filters(dataset=None):
     st.session_state.selected_index = 'VHI'
     st.session_state.selected_region = 'Київська'
     st.session_state.week_range = (1, 52)
@@ -191,11 +351,8 @@ def reset_filters():
     st.session_state.ascending_sort = False
     st.session_state.descending_sort = False
     
-    df = read_vhi_files()
-    if not df.empty:
-        min_year = df['Year'].min()
-        max_year = df['Year'].max()
-        st.session_state.year_range = (min_year, max_year)
+    if dataset is not None:
+        st.session_state.year_range = (dataset.min_year, dataset.max_year)
     else:
         st.session_state.year_range = (1981, 2024)
 
@@ -217,8 +374,8 @@ def main():
             st.warning("first upload data for analysis")
             return
         
-        df = read_vhi_files()
-        if df.empty:
+        dataset = load_dataset(version=lab2.dataset_version())
+        if dataset is None:
             st.warning("data isnt loaded or empty")
             return
         
@@ -232,13 +389,13 @@ def main():
         
         st.session_state.selected_region = st.selectbox(
             "chose region",
-            options=sorted(df['Region_Name'].unique()),
-            index=list(sorted(df['Region_Name'].unique())).index(st.session_state.selected_region) 
-                if st.session_state.selected_region in df['Region_Name'].unique() else 0
+            options=dataset.region_names,
+            index=dataset.region_names.index(st.session_state.selected_region) 
+                if st.session_state.selected_region in dataset.region_names else 0
         )
  
-        min_year = df['Year'].min()
-        max_year = df['Year'].max()
+        min_year = dataset.min_year
+        max_year = dataset.max_year
         
         if st.session_state.year_range[0] < min_year:
             st.session_state.year_range = (min_year, st.session_state.year_range[1])
@@ -293,19 +450,25 @@ def main():
                 on_change=toggle_descending
             )
         
+        st.session_state.chart_backend = st.radio(
+            "charts",
+            options=['interactive', 'matplotlib'],
+            index=['interactive', 'matplotlib'].index(st.session_state.chart_backend),
+            horizontal=True,
+            help="interactive charts are drawn in the browser (zoom, hover), matplotlib renders images on the server"
+        )
+        
         if st.button("reset filters"):
-            reset_filters()
+            reset_filters(dataset)
             st.rerun()  
     
     with col2:
         if st.session_state.data_loaded:
-            filtered_df = df[
-                (df['Region_Name'] == st.session_state.selected_region) &
-                (df['Week'] >= st.session_state.week_range[0]) &
-                (df['Week'] <= st.session_state.week_range[1]) &
-                (df['Year'] >= st.session_state.year_range[0]) &
-                (df['Year'] <= st.session_state.year_range[1])
-            ]
+            filtered_df = dataset.window(
+                st.session_state.selected_region,
+                st.session_state.week_range,
+                st.session_state.year_range
+            )
             
             selected_index = st.session_state.selected_index
             if st.session_state.ascending_sort:
@@ -335,67 +498,34 @@ def main():
                 st.subheader(f"graph {selected_index} for {st.session_state.selected_region}")
                 
                 if not filtered_df.empty:
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    
-                    pivot_df = filtered_df.pivot_table(
-                        index='Week',
-                        columns='Year',
-                        values=selected_index,
-                        aggfunc='mean'
-                    )
-                    
-                    for year in pivot_df.columns:
-                        if year >= st.session_state.year_range[0] and year <= st.session_state.year_range[1]:
-                            ax.plot(pivot_df.index, pivot_df[year], label=str(year))
-                    
-                    ax.set_xlabel('week of year')
-                    ax.set_ylabel(selected_index)
-                    ax.set_title(f'{selected_index} for {st.session_state.selected_region} in {st.session_state.year_range[0]}-{st.session_state.year_range[1]} роки')
-                    ax.legend(title='Рік', bbox_to_anchor=(1.05, 1), loc='upper left')
-                    ax.grid(True, linestyle='--', alpha=0.7)
-                    
-                    ax.set_xlim(st.session_state.week_range[0], st.session_state.week_range[1])
-                    
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    region = st.session_state.selected_region
+                    week_range = tuple(st.session_state.week_range)
+                    year_range = tuple(st.session_state.year_range)
+                    view = (dataset, dataset.version, region, selected_index, week_range, year_range)
+                    if st.session_state.chart_backend == 'interactive':
+                        points = time_series_points(*view)
+                        st.altair_chart(time_series_chart(points, selected_index, region, week_range, year_range),
+                                        use_container_width=True)
+                    else:
+                        st.image(render_time_series(*view))
                 else:
                     st.warning("no data to display with current filters")
             
             with tab3:
                 st.subheader(f"comparison {selected_index} betwem regions")
                 
-                comparison_df = df[
-                    (df['Week'] >= st.session_state.week_range[0]) &
-                    (df['Week'] <= st.session_state.week_range[1]) &
-                    (df['Year'] >= st.session_state.year_range[0]) &
-                    (df['Year'] <= st.session_state.year_range[1])
-                ]
+                region_means = dataset.region_means(
+                    selected_index, st.session_state.week_range, st.session_state.year_range
+                )
                 
-                if not comparison_df.empty:
-                    region_means = comparison_df.groupby('Region_Name')[selected_index].mean().reset_index()
-                    region_means = region_means.sort_values(by=selected_index, ascending=False)
-                    
-                    colors = ['#1f77b4'] * len(region_means)
-                    selected_idx = region_means[region_means['Region_Name'] == st.session_state.selected_region].index
-                    if not selected_idx.empty:
-                        for idx in selected_idx:
-                            colors[idx] = '#ff7f0e'
-                    
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    ax.bar(region_means['Region_Name'], region_means[selected_index], color=colors)
-                    ax.set_xlabel('region')
-                    ax.set_ylabel(f'average value {selected_index}')
-                    ax.set_title(f'comparison  by average values {selected_index} betwen regions')
-                    ax.set_xticklabels(region_means['Region_Name'], rotation=45, ha='right')
-                    
-                    legend_elements = [
-                        Patch(facecolor='#1f77b4', label='other regions'),
-                        Patch(facecolor='#ff7f0e', label=f'selected region: {st.session_state.selected_region}')
-                    ]
-                    ax.legend(handles=legend_elements, loc='upper right')
+                if not region_means.empty:
+                    region_means = region_means.sort_values(by=selected_index, ascending=False).reset_index(drop=True)
                     
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    if st.session_state.chart_backend == 'interactive':
+                        st.altair_chart(comparison_chart(region_means, selected_index, st.session_state.selected_region),
+                                        use_container_width=True)
+                    else:
+                        render_comparison(region_means, selected_index, st.session_state.selected_region)
                     
                     st.subheader("table of comparisonregions")
                     st.dataframe(region_means, use_container_width=True)